@@ -18,6 +18,10 @@ class Config:
         # OpenAI Configuration
         self.openai_api_key: Optional[str] = os.getenv("OPENAI_API_KEY")
         
+        # Long texts are cut down to their most salient sentences before the LLM call
+        self.prompt_compression: bool = os.getenv("PROMPT_COMPRESSION", "true").lower() == "true"
+        self.prompt_token_budget: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+        
         # Supabase Configuration
         self.supabase_url: Optional[str] = os.getenv("SUPABASE_URL").strip()
         self.supabase_api_key: Optional[str] = os.getenv("SUPABASE_API_KEY").strip()
@@ -27,6 +31,58 @@ class Config:
         self.app_version: str = "1.0.0"
         self.debug: bool = os.getenv("DEBUG", "false").lower() == "true"
         
+        # Production server (gunicorn.conf.py)
+        self.port: int = int(os.getenv("PORT", "8000"))
+        self.server_workers: int = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+        self.server_max_requests: int = int(os.getenv("MAX_REQUESTS", "1000"))
+        self.server_max_requests_jitter: int = int(os.getenv("MAX_REQUESTS_JITTER", "100"))
+        self.server_graceful_timeout: int = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+        self.server_timeout: int = int(os.getenv("WORKER_TIMEOUT", "120"))
+        self.server_preload: bool = os.getenv("PRELOAD_APP", "true").lower() == "true"
+        
+        # Responses smaller than this many bytes are sent uncompressed
+        self.compression_min_size: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+        
+        # Read-through cache for list and search responses
+        self.response_cache_max_entries: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+        self.response_cache_ttl: float = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+        
+        # Background analysis jobs
+        self.job_queue_path: str = os.getenv("JOB_QUEUE_PATH", "data/jobs.sqlite3")
+        self.job_workers: int = int(os.getenv("JOB_WORKERS", "2"))
+        self.job_queue_max_depth: int = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "1000"))
+        self.job_max_attempts: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+        # A running job whose worker has not renewed its lease for this long is re-queued
+        self.job_lease_seconds: float = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+        # Running jobs get this long to finish on shutdown; by default a little less than
+        # GRACEFUL_TIMEOUT, so unfinished ones are re-queued before gunicorn kills the worker
+        self.job_shutdown_timeout: float = float(os.getenv("JOB_SHUTDOWN_TIMEOUT", str(max(self.server_graceful_timeout - 5, 0))))
+        
+        # Related-analyses vector index
+        self.vector_index_dir: str = os.getenv("VECTOR_INDEX_DIR", "data/vector_index")
+        self.vector_index_flush_every: int = int(os.getenv("VECTOR_INDEX_FLUSH_EVERY", "256"))
+        
+        # Each server process rebuilds its autocomplete terms from the database this often
+        self.suggest_refresh_seconds: float = float(os.getenv("SUGGEST_REFRESH_SECONDS", "300"))
+        
+        # Admission control for the expensive endpoints (limits are per server process)
+        self.admission_rate: float = float(os.getenv("ADMISSION_RATE", "1"))
+        self.admission_burst: float = float(os.getenv("ADMISSION_BURST", "10"))
+        self.admission_max_clients: int = int(os.getenv("ADMISSION_MAX_CLIENTS", "10000"))
+        self.admission_max_in_flight: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "16"))
+        self.admission_max_waiting: int = int(os.getenv("ADMISSION_MAX_WAITING", "64"))
+        self.admission_target_delay_ms: float = float(os.getenv("ADMISSION_TARGET_DELAY_MS", "500"))
+        self.admission_interval_ms: float = float(os.getenv("ADMISSION_INTERVAL_MS", "2000"))
+        self.admission_trusted_proxies: int = int(os.getenv("ADMISSION_TRUSTED_PROXIES", "0"))
+        
+        # Bulk ingestion pipeline (ingest.py and POST /ingest)
+        self.ingest_llm_concurrency: int = int(os.getenv("INGEST_LLM_CONCURRENCY", "8"))
+        self.ingest_insight_batch: int = int(os.getenv("INGEST_INSIGHT_BATCH", "32"))
+        self.ingest_write_batch: int = int(os.getenv("INGEST_WRITE_BATCH", "100"))
+        self.ingest_queue_size: int = int(os.getenv("INGEST_QUEUE_SIZE", "64"))
+        self.ingest_progress_every: int = int(os.getenv("INGEST_PROGRESS_EVERY", "100"))
+        self.ingest_max_errors: int = int(os.getenv("INGEST_MAX_ERRORS", "100"))
+        
 
     
     def is_openai_available(self) -> bool:
@@ -43,7 +99,9 @@ class Config:
             "api_key": self.openai_api_key,
             "model": "gpt-3.5-turbo",
             "temperature": 0.3,
-            "max_tokens": 500
+            "max_tokens": 500,
+            "prompt_compression": self.prompt_compression,
+            "prompt_token_budget": self.prompt_token_budget
         }
     
     def get_supabase_config(self) -> dict:
@@ -53,6 +111,73 @@ class Config:
             "api_key": self.supabase_api_key.strip(),
             "table_name": "text_analyses"
         }
+    
+    def get_server_config(self) -> dict:
+        """Get production server configuration"""
+        return {
+            "port": self.port,
+            "workers": self.server_workers,
+            "max_requests": self.server_max_requests,
+            "max_requests_jitter": self.server_max_requests_jitter,
+            "graceful_timeout": self.server_graceful_timeout,
+            "timeout": self.server_timeout,
+            "preload": self.server_preload
+        }
+    
+    def get_response_cache_config(self) -> dict:
+        """Get list/search response cache configuration"""
+        return {
+            "max_entries": self.response_cache_max_entries,
+            "ttl": self.response_cache_ttl
+        }
+    
+    def get_job_queue_config(self) -> dict:
+        """Get background job queue configuration"""
+        return {
+            "db_path": self.job_queue_path,
+            "workers": self.job_workers,
+            "max_depth": self.job_queue_max_depth,
+            "max_attempts": self.job_max_attempts,
+            "lease_seconds": self.job_lease_seconds,
+            "shutdown_timeout": self.job_shutdown_timeout
+        }
+    
+    def get_vector_index_config(self) -> dict:
+        """Get related-analyses vector index configuration"""
+        return {
+            "index_dir": self.vector_index_dir,
+            "flush_every": self.vector_index_flush_every
+        }
+    
+    def get_suggest_config(self) -> dict:
+        """Get autocomplete suggestion index configuration"""
+        return {
+            "refresh_seconds": self.suggest_refresh_seconds
+        }
+    
+    def get_admission_config(self) -> dict:
+        """Get admission control configuration (delays in seconds)"""
+        return {
+            "rate": self.admission_rate,
+            "burst": self.admission_burst,
+            "max_clients": self.admission_max_clients,
+            "max_in_flight": self.admission_max_in_flight,
+            "max_waiting": self.admission_max_waiting,
+            "target_delay": self.admission_target_delay_ms / 1000,
+            "interval": self.admission_interval_ms / 1000,
+            "trusted_proxies": self.admission_trusted_proxies
+        }
+    
+    def get_ingestion_config(self) -> dict:
+        """Get bulk ingestion pipeline configuration"""
+        return {
+            "llm_concurrency": self.ingest_llm_concurrency,
+            "insight_batch": self.ingest_insight_batch,
+            "write_batch": self.ingest_write_batch,
+            "queue_size": self.ingest_queue_size,
+            "progress_every": self.ingest_progress_every,
+            "max_errors": self.ingest_max_errors
+        }
 
 # Global config instance
 config = Config()
@@ -0,0 +1,50 @@
+"""
+Gunicorn configuration for running the API in production.
+
+The app is imported once in the master process (preload_app), which loads the
+spaCy model, NLTK stopwords and config before any worker is forked. Workers
+then share those pages copy-on-write instead of each loading its own copy.
+
+Usage (from the backend directory):
+    gunicorn main:app -c gunicorn.conf.py
+"""
+import gc
+# Gunicorn reads every module-level name that matches one of its settings, and
+# "config" is one, so the app config must be imported under another name
+from config import config as app_config
+
+server_config = app_config.get_server_config()
+
+bind = f"0.0.0.0:{server_config['port']}"
+workers = server_config["workers"]
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = server_config["preload"]
+
+# Recycle workers periodically to bound memory growth; jitter avoids restarting them all at once
+max_requests = server_config["max_requests"]
+max_requests_jitter = server_config["max_requests_jitter"]
+
+# On SIGTERM, workers get this long to finish in-flight requests before being killed
+graceful_timeout = server_config["graceful_timeout"]
+timeout = server_config["timeout"]
+keepalive = 5
+
+def when_ready(server):
+    """Runs in the master after the app is preloaded, before workers are forked"""
+    if not server.cfg.preload_app:
+        # Each worker imports the app and builds its indexes itself
+        return
+    from main import backfill_vector_index, build_suggest_index
+    # Run to completion here so forked workers inherit the finished index
+    backfill_vector_index()
+    build_suggest_index()
+
+    # Move everything allocated so far into the permanent generation. The GC in
+    # workers then never touches these objects, so their pages stay shared.
+    gc.freeze()
+    server.log.info("Models preloaded; %d objects frozen for copy-on-write sharing", gc.get_freeze_count())
+
+def post_fork(server, worker):
+    """Sockets and HTTP connection pools must not be shared between processes"""
+    from main import reset_after_fork
+    reset_after_fork()
@@ -0,0 +1,59 @@
+"""
+Bulk-analyze a JSONL or CSV corpus and store the results.
+
+The file is read lazily and streamed through the ingestion pipeline: spaCy
+insights in batches, concurrent LLM calls, multi-row database inserts and
+related-analyses indexing. Memory use does not grow with the file size.
+Records that fail are reported by line number and do not stop the run.
+
+Usage (from the backend directory):
+    python ingest.py corpus.jsonl [--text-field text]
+    python ingest.py corpus.csv [--format csv] [--text-field body] [--errors-out errors.json]
+"""
+import argparse
+import asyncio
+import json
+import sys
+from typing import Any, Dict, Optional
+from services.database_service import DatabaseService
+from services.ingestion import FORMATS, IngestionPipeline, format_for_path, iter_records
+from services.llm_service import LLMService
+from services.text_processor import TextProcessor
+from services.vector_index import VectorIndex
+
+def print_progress(summary: Dict[str, Any]):
+    processed = summary["succeeded"] + summary["failed"]
+    print(f"📥 {processed} processed ({summary['succeeded']} ok, {summary['failed']} failed), "
+          f"{summary['records_per_second']}/s, {summary['elapsed_seconds']}s elapsed")
+
+async def ingest(path: str, fmt: str, text_field: str) -> Dict[str, Any]:
+    pipeline = IngestionPipeline(TextProcessor(), LLMService(), DatabaseService(), VectorIndex(), on_progress=print_progress)
+    # newline="" keeps line endings inside quoted CSV fields intact
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return await pipeline.run(iter_records(f, fmt, text_field))
+
+def main(path: str, fmt: Optional[str], text_field: str, errors_out: Optional[str]):
+    fmt = fmt or format_for_path(path)
+    print(f"📥 Ingesting {path} as {fmt} (text field '{text_field}')")
+    summary = asyncio.run(ingest(path, fmt, text_field))
+
+    for error in summary["errors"]:
+        print(f"⚠️  Line {error['line']}: {error['error']}")
+    if summary["failed"] > len(summary["errors"]):
+        print(f"⚠️  ... {summary['failed'] - len(summary['errors'])} more errors not shown")
+    if errors_out:
+        with open(errors_out, "w") as f:
+            json.dump(summary["errors"], f, indent=2)
+
+    print(f"✅ Ingestion complete: {summary['succeeded']} stored, {summary['failed']} failed, "
+          f"{summary['received']} read in {summary['elapsed_seconds']}s ({summary['records_per_second']}/s)")
+    return 1 if summary["failed"] else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSONL or CSV file to ingest")
+    parser.add_argument("--format", choices=FORMATS, help="input format (default: inferred from the extension)")
+    parser.add_argument("--text-field", default="text", help="JSON key or CSV column holding the text")
+    parser.add_argument("--errors-out", help="write per-record errors to this JSON file")
+    args = parser.parse_args()
+    sys.exit(main(args.path, args.format, args.text_field, args.errors_out))
@@ -1,15 +1,35 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from typing import List, Optional
 import os
+import asyncio
+import time
 from datetime import datetime
 from services.llm_service import LLMService
-from services.database_service import DatabaseService
+from services.database_service import DatabaseService, ANALYSIS_FIELDS
 from services.text_processor import TextProcessor
 from services.url_extractor import url_extractor
+from services.vector_index import VectorIndex
+from services.response_cache import ResponseCache, etag_matches
+from services.job_queue import JobQueue, QueueFullError
+from services.admission import AdmissionControlMiddleware, admission_control
+from services.suggest_index import SuggestIndex, KINDS, MAX_LIMIT
+from services.ingestion import IngestionPipeline, FORMATS, aiter_records, combine_analysis
+from config import config
 
-app = FastAPI(title="LLM Knowledge Extractor", version="1.0.0")
+app = FastAPI(title="LLM Knowledge Extractor", version="1.0.0", default_response_class=ORJSONResponse)
+
+# Admission control for the expensive endpoints. Added first so it sits inside
+# CORS and rejections still carry CORS headers; other paths (e.g. /health) bypass it
+app.add_middleware(
+    AdmissionControlMiddleware,
+    rate_limited=["/analyze", "/jobs/analyze", "/extract-url", "/ingest"],
+    concurrency_limited=["/analyze", "/extract-url"],
+)
 
 # CORS middleware for frontend communication
 app.add_middleware(
@@ -18,12 +38,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Retry-After"],
 )
 
+# Compress responses above a size threshold; prefer brotli when the client accepts it
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, quality=4, minimum_size=config.compression_min_size, gzip_fallback=True)
+except ImportError:
+    print("⚠️  brotli-asgi not installed, falling back to gzip compression")
+    app.add_middleware(GZipMiddleware, minimum_size=config.compression_min_size)
+
 # Initialize services
 llm_service = LLMService()
 db_service = DatabaseService()
 text_processor = TextProcessor()
+vector_index = VectorIndex()
+suggest_index = SuggestIndex()
+response_cache = ResponseCache()
 
 class TextAnalysisRequest(BaseModel):
     text: str
@@ -44,6 +76,32 @@ class TextAnalysisResponse(BaseModel):
     word_count: Optional[int] = None
     sentence_count: Optional[int] = None
 
+class JobSubmitResponse(BaseModel):
+    id: str
+    status: str
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str
+    result: Optional[TextAnalysisResponse] = None
+    error: Optional[str] = None
+    attempts: int
+    created_at: float
+    updated_at: float
+
+class IngestError(BaseModel):
+    line: int
+    error: str
+
+class IngestResponse(BaseModel):
+    received: int
+    succeeded: int
+    failed: int
+    elapsed_seconds: float
+    records_per_second: float
+    errors: List[IngestError]
+
 class SearchRequest(BaseModel):
     topic: Optional[str] = None
     keyword: Optional[str] = None
@@ -60,6 +118,104 @@ class URLExtractionResponse(BaseModel):
     extracted_at: Optional[str] = None
     error: Optional[str] = None
 
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Parse a comma-separated fields= projection; id is always included"""
+    if not fields:
+        return list(ANALYSIS_FIELDS)
+    
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ANALYSIS_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", *requested]))
+
+async def cached_response(request: Request, key: tuple, loader) -> Response:
+    """Serve a list response from the read-through cache, honouring If-None-Match"""
+    entry = await response_cache.get_or_load(key, db_service.data_version, loader)
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def reset_after_fork():
+    """Re-create network clients in a freshly forked server worker"""
+    db_service.connect()
+    llm_service.connect()
+    url_extractor.reset_session()
+
+def backfill_vector_index():
+    """Build the related-analyses index from the database on first run (blocking)"""
+    if len(vector_index) > 0 or not db_service.supabase:
+        return
+    try:
+        print("🧮 Building vector index from existing analyses...")
+        for rows in db_service.iter_analyses("id, text_hash, keywords, phrases"):
+            texts = db_service.get_texts([row["text_hash"] for row in rows])
+            rows = [row for row in rows if row["text_hash"] in texts]
+            lemmas = text_processor.extract_lemmas_batch(texts[row["text_hash"]] for row in rows)
+            for row, row_lemmas in zip(rows, lemmas):
+                vector_index.add(row["id"], VectorIndex.build_terms(row_lemmas, row.get("keywords"), row.get("phrases")))
+        vector_index.flush()
+    except Exception as e:
+        print(f"⚠️  Vector index backfill failed: {str(e)}")
+
+@app.on_event("startup")
+async def start_vector_index_backfill():
+    """Backfill in a worker thread so the server starts answering requests right away"""
+    asyncio.get_running_loop().run_in_executor(None, backfill_vector_index)
+
+def build_suggest_index():
+    """Load autocomplete terms from every stored analysis (blocking)"""
+    if not db_service.supabase:
+        return
+    try:
+        print("🔤 Building suggestion index...")
+        suggest_index.build(
+            row for rows in db_service.iter_analyses("id, topics, keywords, entities") for row in rows
+        )
+        print(f"🔤 Suggestion index ready with {len(suggest_index)} terms")
+    except Exception as e:
+        print(f"⚠️  Suggestion index build failed: {str(e)}")
+
+async def refresh_suggest_index():
+    """Rebuild periodically so terms saved through other server processes show up here too"""
+    loop = asyncio.get_running_loop()
+    interval = config.get_suggest_config()["refresh_seconds"]
+    if interval <= 0:
+        # Periodic refresh disabled; only build if nothing was inherited
+        if not suggest_index.built:
+            await loop.run_in_executor(None, build_suggest_index)
+        return
+    while True:
+        # A worker forked (or recycled) from the master starts with the master's snapshot
+        stale_in = suggest_index.built_at + interval - time.time()
+        if stale_in > 0:
+            await asyncio.sleep(stale_in)
+        await loop.run_in_executor(None, build_suggest_index)
+        if suggest_index.built_at + interval <= time.time():
+            # The build failed; keep serving the old terms and try again later
+            await asyncio.sleep(interval)
+
+@app.on_event("startup")
+async def start_suggest_index_refresh():
+    app.state.suggest_refresh = asyncio.create_task(refresh_suggest_index())
+
+@app.on_event("shutdown")
+async def stop_suggest_index_refresh():
+    app.state.suggest_refresh.cancel()
+
+@app.on_event("startup")
+async def start_job_workers():
+    job_queue.start()
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    await job_queue.stop()
+
+@app.on_event("shutdown")
+async def flush_vector_index():
+    vector_index.flush()
+
 @app.get("/")
 async def root():
     return {"message": "LLM Knowledge Extractor API", "status": "running"}
@@ -70,7 +226,9 @@ async def health_check():
     return {
         "status": "healthy",
         "database": "connected" if db_service.supabase else "disconnected",
-        "llm": "available" if llm_service.client else "unavailable"
+        "llm": "available" if llm_service.client else "unavailable",
+        "prompts": llm_service.get_prompt_stats(),
+        "admission": admission_control.stats()
     }
 
 @app.post("/extract-url", response_model=URLExtractionResponse)
@@ -78,7 +236,9 @@ async def extract_url_content(request: URLExtractionRequest):
     """Extract text content from a URL"""
     try:
         print(f"🔗 API: Extracting content from URL: {request.url}")
-        result = url_extractor.extract_content_from_url(request.url)
+        # Fetching blocks, so keep it off the event loop
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, url_extractor.extract_content_from_url, request.url)
         print(f"🔗 API: URL extraction {'successful' if result['success'] else 'failed'}")
         return URLExtractionResponse(**result)
     except Exception as e:
@@ -88,6 +248,62 @@ async def extract_url_content(request: URLExtractionRequest):
             error=f"URL extraction failed: {str(e)}"
         )
 
+async def run_analysis(text: str) -> TextAnalysisResponse:
+    """Run the full analysis pipeline (spaCy + LLM), save and index the result"""
+    # Get enhanced insights using spaCy; run off the event loop so other requests keep flowing
+    print("🔍 API: Getting advanced insights...")
+    loop = asyncio.get_running_loop()
+    advanced_insights = await loop.run_in_executor(None, text_processor.get_advanced_insights, text)
+    
+    # Get LLM analysis
+    print("🔍 API: Getting LLM analysis...")
+    llm_analysis = await llm_service.analyze_text(text, advanced_insights.get("sentences"))
+    
+    # Combine results
+    analysis_data = combine_analysis(text, advanced_insights, llm_analysis, text_processor.analyzer_version)
+    
+    # Save to database
+    print("💾 API: Saving analysis to database...")
+    analysis_id = await db_service.save_analysis(analysis_data)
+    
+    suggest_index.add_analysis(analysis_data, analysis_id)
+    
+    # Index for related-analyses lookups; never fail the request over it
+    try:
+        await loop.run_in_executor(None, vector_index.add, analysis_id, VectorIndex.build_terms(
+            advanced_insights.get("lemmas", []),
+            analysis_data["keywords"],
+            analysis_data.get("phrases")
+        ))
+    except Exception as e:
+        print(f"⚠️  API: Vector indexing failed: {str(e)}")
+    
+    print(f"✅ API: Analysis completed successfully: {analysis_id}")
+    
+    return TextAnalysisResponse(
+        id=analysis_id,
+        summary=analysis_data["summary"],
+        title=analysis_data["title"],
+        topics=analysis_data["topics"],
+        sentiment=analysis_data["sentiment"],
+        keywords=analysis_data["keywords"],
+        confidence_score=analysis_data["confidence_score"],
+        created_at=datetime.utcnow().isoformat(),  # Use proper timestamp
+        entities=analysis_data.get("entities"),
+        phrases=analysis_data.get("phrases"),
+        readability_score=analysis_data.get("readability_score"),
+        word_count=analysis_data.get("word_count"),
+        sentence_count=analysis_data.get("sentence_count")
+    )
+
+async def run_job(job: dict) -> dict:
+    """Job queue handler; returns a JSON-serializable result"""
+    if job["kind"] == "analyze":
+        return jsonable_encoder(await run_analysis(job["text"]))
+    raise ValueError(f"Unknown job kind: {job['kind']}")
+
+job_queue = JobQueue(handler=run_job)
+
 @app.post("/analyze", response_model=TextAnalysisResponse)
 async def analyze_text(request: TextAnalysisRequest):
     try:
@@ -97,88 +313,129 @@ async def analyze_text(request: TextAnalysisRequest):
         if not request.text or not request.text.strip():
             raise HTTPException(status_code=400, detail="Text input cannot be empty")
         
-        # Get enhanced insights using spaCy
-        print("🔍 API: Getting advanced insights...")
-        advanced_insights = text_processor.get_advanced_insights(request.text)
-        
-        # Get LLM analysis
-        print("🔍 API: Getting LLM analysis...")
-        llm_analysis = await llm_service.analyze_text(request.text)
-        
-        # Combine results
-        analysis_data = {
-            "text": request.text,
-            "summary": llm_analysis["summary"],
-            "title": llm_analysis.get("title"),
-            "topics": llm_analysis["topics"],
-            "sentiment": llm_analysis["sentiment"],
-            "keywords": advanced_insights["keywords"],
-            "confidence_score": llm_analysis.get("confidence_score", 0.8),
-            "entities": advanced_insights.get("entities"),
-            "phrases": advanced_insights.get("phrases"),
-            "readability_score": advanced_insights.get("readability_score"),
-            "word_count": advanced_insights.get("word_count"),
-            "sentence_count": advanced_insights.get("sentence_count")
-        }
-        
-        # Save to database
-        print("💾 API: Saving analysis to database...")
-        analysis_id = await db_service.save_analysis(analysis_data)
-        
-        print(f"✅ API: Analysis completed successfully: {analysis_id}")
-        
-        # Return response
-        return TextAnalysisResponse(
-            id=analysis_id,
-            summary=analysis_data["summary"],
-            title=analysis_data["title"],
-            topics=analysis_data["topics"],
-            sentiment=analysis_data["sentiment"],
-            keywords=analysis_data["keywords"],
-            confidence_score=analysis_data["confidence_score"],
-            created_at=datetime.utcnow().isoformat(),  # Use proper timestamp
-            entities=analysis_data.get("entities"),
-            phrases=analysis_data.get("phrases"),
-            readability_score=analysis_data.get("readability_score"),
-            word_count=analysis_data.get("word_count"),
-            sentence_count=analysis_data.get("sentence_count")
-        )
+        return await run_analysis(request.text)
         
     except Exception as e:
         print(f"❌ API: Analysis failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
+@app.post("/jobs/analyze", response_model=JobSubmitResponse, status_code=202)
+async def submit_analysis_job(request: TextAnalysisRequest):
+    """Queue text for background analysis and return a job id immediately"""
+    if not request.text or not request.text.strip():
+        raise HTTPException(status_code=400, detail="Text input cannot be empty")
+    
+    try:
+        job_id = job_queue.submit("analyze", {"text": request.text})
+    except QueueFullError as e:
+        print(f"⚠️  API: Rejecting job: {str(e)}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    
+    print(f"👷 API: Queued analysis job {job_id} for text length: {len(request.text)}")
+    return JobSubmitResponse(id=job_id, status="queued")
+
+@app.post("/ingest", response_model=IngestResponse)
+async def ingest(request: Request, fmt: str = Query("jsonl", alias="format"), text_field: str = "text"):
+    """
+    Analyze a JSONL or CSV corpus streamed as the raw request body. Records are
+    processed while the upload is still arriving; the response summarizes the run.
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {fmt}")
+    
+    print(f"📥 API: Starting {fmt} ingestion (text field '{text_field}')")
+    pipeline = IngestionPipeline(text_processor, llm_service, db_service, vector_index, suggest_index)
+    try:
+        summary = await pipeline.run(aiter_records(request.stream(), fmt, text_field))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ API: Ingestion failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
+    
+    print(f"✅ API: Ingested {summary['succeeded']} records ({summary['failed']} failed) in {summary['elapsed_seconds']}s")
+    return IngestResponse(**summary)
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return JobResponse(**job)
+
 @app.get("/search")
 async def search_analyses(
+    request: Request,
     topic: Optional[str] = None, 
     keyword: Optional[str] = None, 
     sentiment: Optional[str] = None,
-    sortBy: Optional[str] = "newest"
+    sortBy: Optional[str] = "newest",
+    fields: Optional[str] = None
 ):
+    projection = parse_fields(fields)
     try:
         if not topic and not keyword:
             raise HTTPException(status_code=400, detail="Either topic or keyword parameter is required")
         
         print(f"🔍 API: Searching for topic='{topic}', keyword='{keyword}', sentiment='{sentiment}', sortBy='{sortBy}'")
-        results = await db_service.search_analyses(topic, keyword, sentiment, sortBy)
-        print(f"🔍 API: Found {len(results)} search results")
-        return {"analyses": results}
+        
+        async def load():
+            results = await db_service.search_analyses(topic, keyword, sentiment, sortBy, projection)
+            print(f"🔍 API: Found {len(results)} search results")
+            return {"analyses": results}
+        
+        key = ("search", topic, keyword, sentiment, sortBy, tuple(projection))
+        return await cached_response(request, key, load)
         
     except Exception as e:
         print(f"❌ API: Search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@app.get("/suggest")
+async def suggest(prefix: str, limit: int = Query(10, ge=1, le=MAX_LIMIT), kind: Optional[str] = None):
+    """Autocomplete topics, keywords and entity names, most frequent first"""
+    if kind and kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"Unknown kind: {kind}")
+    return {"suggestions": suggest_index.suggest(prefix, limit, kind)}
+
 @app.get("/analyses")
-async def get_all_analyses():
+async def get_all_analyses(request: Request, fields: Optional[str] = None):
+    projection = parse_fields(fields)
     try:
-        print("📊 API: Fetching all analyses...")
-        results = await db_service.get_all_analyses()
-        print(f"📊 API: Returning {len(results)} analyses")
-        return {"analyses": results}
+        async def load():
+            print("📊 API: Fetching all analyses...")
+            results = await db_service.get_all_analyses(projection)
+            print(f"📊 API: Returning {len(results)} analyses")
+            return {"analyses": results}
+        
+        return await cached_response(request, ("analyses", tuple(projection)), load)
     except Exception as e:
         print(f"❌ API: Error fetching analyses: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch analyses: {str(e)}")
 
+@app.get("/analyses/{analysis_id}/related")
+async def get_related_analyses(analysis_id: str, k: int = Query(5, ge=1, le=50), fields: Optional[str] = None):
+    projection = parse_fields(fields)
+    try:
+        print(f"🧮 API: Finding {k} analyses related to {analysis_id}")
+        # The lookup may reload the index after another worker flushed it
+        matches = await asyncio.get_running_loop().run_in_executor(None, vector_index.related, analysis_id, k)
+        if matches is None:
+            raise HTTPException(status_code=404, detail="Analysis not found in related index")
+        
+        scores = dict(matches)
+        results = await db_service.get_analyses_by_ids([match_id for match_id, _ in matches], projection)
+        for analysis in results:
+            analysis["similarity"] = round(scores[analysis["id"]], 4)
+        print(f"🧮 API: Returning {len(results)} related analyses")
+        return ORJSONResponse({"analyses": results})
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ API: Related analyses error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch related analyses: {str(e)}")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,134 @@
+"""
+Measure the memory use and startup time of the production server, with and
+without preloading the app in the Gunicorn master.
+
+For each mode, Gunicorn is started with gunicorn.conf.py and the given worker
+count, and the script reports:
+
+- startup: seconds from launch until /health answers
+- PSS: proportional set size summed over the master and its workers, read
+  from /proc/<pid>/smaps_rollup (shared pages are split between the processes
+  sharing them, so unlike RSS the total is not inflated by copy-on-write),
+  and per worker (the workers' share of that total, divided by the count)
+- respawn: seconds from sending SIGTERM to one worker until its replacement
+  logs that application startup is complete
+
+Linux only. The app needs its usual configuration (.env) and the spaCy model.
+
+Usage (from the backend directory):
+    python measure_server.py [--workers 4] [--port 8765] [--settle 5]
+"""
+import argparse
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Callable, Dict, List
+
+def wait_for_health(port: int, timeout: float) -> float:
+    """Poll /health until it answers; returns seconds waited"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                if response.status == 200:
+                    return time.monotonic() - started
+        except OSError:
+            pass
+        time.sleep(0.05)
+    raise TimeoutError(f"/health did not answer within {timeout}s")
+
+def wait_until(condition: Callable[[], Any], timeout: float, what: str) -> Any:
+    """Poll condition until it returns something truthy, and return that"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        result = condition()
+        if result:
+            return result
+        time.sleep(0.01)
+    raise TimeoutError(f"timed out after {timeout}s waiting for {what}")
+
+def children(pid: int) -> List[int]:
+    pids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            pids.extend(int(child) for child in f.read().split())
+    return pids
+
+def pss_kib(pid: int) -> int:
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1])
+    return 0
+
+def wait_for_log(log_path: str, pattern: "re.Pattern", timeout: float) -> float:
+    """Wait until a line matching pattern appears in the log; returns seconds waited"""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        with open(log_path, errors="replace") as f:
+            if pattern.search(f.read()):
+                return time.monotonic() - started
+        time.sleep(0.05)
+    raise TimeoutError(f"no log line matching {pattern.pattern!r} within {timeout}s")
+
+def measure(preload: bool, workers: int, port: int, settle: float, timeout: float) -> Dict[str, Any]:
+    env = dict(os.environ, PRELOAD_APP=str(preload).lower(), WEB_CONCURRENCY=str(workers), PORT=str(port))
+    with tempfile.NamedTemporaryFile(suffix=".log", delete=False) as log:
+        log_path = log.name
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "main:app", "-c", "gunicorn.conf.py", "--error-logfile", log_path],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        launched = time.monotonic()
+        wait_for_health(port, timeout)
+        # Every worker must be up, not just the first one to answer
+        wait_until(lambda: len(children(server.pid)) >= workers, timeout, f"{workers} workers")
+        startup = time.monotonic() - launched
+        # Let the background index builds finish before reading memory
+        time.sleep(settle)
+        master_pss = pss_kib(server.pid)
+        worker_pss = sum(pss_kib(pid) for pid in children(server.pid))
+
+        original = set(children(server.pid))
+        os.kill(min(original), signal.SIGTERM)
+        started = time.monotonic()
+        replacements = wait_until(lambda: set(children(server.pid)) - original, timeout, "a replacement worker")
+        new_pid = replacements.pop()
+        wait_for_log(log_path, re.compile(rf"\[{new_pid}\] \[INFO\] Application startup complete"), timeout)
+        respawn = time.monotonic() - started
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+        os.unlink(log_path)
+
+    return {
+        "preload": preload,
+        "startup": startup,
+        "pss_mib": (master_pss + worker_pss) / 1024,
+        "worker_pss_mib": worker_pss / workers / 1024,
+        "respawn": respawn
+    }
+
+def main(workers: int, port: int, settle: float, timeout: float):
+    results = [measure(preload, workers, port, settle, timeout) for preload in (False, True)]
+    print(f"\n{workers} workers, Python {sys.version.split()[0]}")
+    print("| preload_app | Startup (s) | Total PSS (MiB) | PSS per worker (MiB) | Worker respawn (s) |")
+    print("| --- | --- | --- | --- | --- |")
+    for result in results:
+        print(f"| {result['preload']} | {result['startup']:.1f} | {result['pss_mib']:.0f} | "
+              f"{result['worker_pss_mib']:.0f} | {result['respawn']:.2f} |")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="worker processes to start in each mode")
+    parser.add_argument("--port", type=int, default=8765, help="port to bind while measuring")
+    parser.add_argument("--settle", type=float, default=5, help="seconds to wait after startup before reading PSS")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for the server or a worker")
+    args = parser.parse_args()
+    main(args.workers, args.port, args.settle, args.timeout)
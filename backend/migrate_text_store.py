@@ -0,0 +1,45 @@
+"""
+One-off migration: move raw text out of text_analyses.text into the
+content-addressed text_blobs store. Safe to re-run; it only touches rows
+that do not have a text_hash yet. See the notes at the end of schema.sql.
+
+Usage (from the backend directory):
+    python migrate_text_store.py [--batch-size 200]
+"""
+import argparse
+from services.database_service import DatabaseService
+
+def migrate(batch_size: int):
+    db_service = DatabaseService()
+    if not db_service.supabase:
+        print("❌ Database not available, nothing to migrate")
+        return
+
+    table = db_service.supabase.table(db_service.table_name)
+    migrated = 0
+    while True:
+        # Migrated rows drop out of this filter, so each query returns the next batch
+        rows = (
+            table.select("id, text")
+            .is_("text_hash", "null")
+            .not_.is_("text", "null")
+            .limit(batch_size)
+            .execute()
+            .data
+        ) or []
+        if not rows:
+            break
+
+        for row in rows:
+            text_hash, text_length = db_service.save_text(row["text"])
+            table.update({"text_hash": text_hash, "text_length": text_length, "text": None}).eq("id", row["id"]).execute()
+        migrated += len(rows)
+        print(f"📦 Migrated {migrated} analyses...")
+
+    print(f"✅ Migration complete: {migrated} analyses moved to text_blobs")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    migrate(args.batch_size)
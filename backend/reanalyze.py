@@ -0,0 +1,118 @@
+"""
+Recompute the local spaCy insights (keywords, entities, phrases, readability,
+word/sentence counts) of stored analyses after TextProcessor logic or the spaCy
+model changes. OpenAI is not called; summaries, titles, topics and sentiment
+are left as they are.
+
+Rows are streamed in id order in keyset-paginated chunks. Only rows whose
+analyzer_version differs from the current one are processed (unless --force).
+They are parsed with multi-process nlp.pipe and written back in batches.
+Progress is checkpointed after every write, so an interrupted run resumes
+where it stopped.
+
+Usage (from the backend directory):
+    python reanalyze.py [--processes 4] [--chunk-size 500] [--write-batch 200] [--force] [--restart]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from services.database_service import DatabaseService
+from services.text_processor import TextProcessor
+
+DEFAULT_CHECKPOINT = "data/reanalyze_checkpoint.json"
+
+def load_checkpoint(path: str, analyzer_version: str) -> Dict[str, Any]:
+    """Load a checkpoint written for the same analyzer version, if any"""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("analyzer_version") != analyzer_version:
+        print(f"⚠️  Ignoring checkpoint for analyzer {checkpoint.get('analyzer_version')}")
+        return {}
+    return checkpoint
+
+def save_checkpoint(path: str, checkpoint: Dict[str, Any]):
+    checkpoint_dir = os.path.dirname(path)
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(path + ".tmp", "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(path + ".tmp", path)
+
+def stale_texts(db_service: DatabaseService, analyzer_version: str, chunk_size: int, after_id: Optional[str], force: bool, stats: Dict[str, int]) -> Iterator[Tuple[str, str]]:
+    """Yield (text, analysis id) for every row that needs recomputing, in id order"""
+    for rows in db_service.iter_analyses("id, text_hash, analyzer_version", chunk_size, after_id):
+        stale = rows if force else [row for row in rows if row.get("analyzer_version") != analyzer_version]
+        stats["skipped"] += len(rows) - len(stale)
+        texts = db_service.get_texts([row["text_hash"] for row in stale])
+        for row in stale:
+            if row["text_hash"] not in texts:
+                print(f"⚠️  No stored text for analysis {row['id']}, skipping")
+                stats["missing"] += 1
+                continue
+            yield texts[row["text_hash"]], row["id"]
+
+def reanalyze(processes: int, chunk_size: int, write_batch: int, checkpoint_path: str, force: bool, restart: bool):
+    db_service = DatabaseService()
+    if not db_service.supabase:
+        print("❌ Database not available, nothing to reanalyze")
+        return
+
+    text_processor = TextProcessor()
+    analyzer_version = text_processor.analyzer_version
+    checkpoint = {} if restart else load_checkpoint(checkpoint_path, analyzer_version)
+    stats = {"updated": 0, "skipped": 0, "missing": 0, **checkpoint.get("stats", {})}
+    if checkpoint:
+        print(f"🔁 Resuming after analysis {checkpoint['last_id']} ({stats['updated']} already updated)")
+    print(f"🧪 Reanalyzing with {analyzer_version} using {processes} processes")
+
+    started = time.time()
+    pending = []
+
+    def write_pending():
+        db_service.update_insights(pending)
+        stats["updated"] += len(pending)
+        save_checkpoint(checkpoint_path, {
+            "analyzer_version": analyzer_version,
+            "last_id": pending[-1]["id"],
+            "stats": stats
+        })
+        rate = stats["updated"] / max(time.time() - started, 1e-9)
+        print(f"💾 Updated {stats['updated']} analyses ({stats['skipped']} up to date, {rate:.1f}/s)")
+        pending.clear()
+
+    texts = stale_texts(db_service, analyzer_version, chunk_size, checkpoint.get("last_id"), force, stats)
+    for insights, analysis_id in text_processor.get_advanced_insights_batch(texts, n_process=processes):
+        pending.append({
+            "id": analysis_id,
+            "keywords": insights["keywords"],
+            "entities": insights.get("entities", {}),
+            "phrases": insights.get("phrases", []),
+            "readability_score": insights.get("readability_score"),
+            "word_count": insights.get("word_count"),
+            "sentence_count": insights.get("sentence_count"),
+            "analyzer_version": analyzer_version
+        })
+        if len(pending) >= write_batch:
+            write_pending()
+    if pending:
+        write_pending()
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    print(f"✅ Reanalysis complete: {stats['updated']} updated, {stats['skipped']} already up to date, "
+          f"{stats['missing']} missing text, in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="nlp.pipe worker processes")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows fetched per keyset query")
+    parser.add_argument("--write-batch", type=int, default=200, help="rows per batched update")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file path")
+    parser.add_argument("--force", action="store_true", help="recompute rows already at the current analyzer version")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    args = parser.parse_args()
+    reanalyze(args.processes, args.chunk_size, args.write_batch, args.checkpoint, args.force, args.restart)
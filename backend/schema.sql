@@ -1,7 +1,16 @@
+-- Content-addressed store for raw analysis text (zstd-compressed, keyed by SHA-256)
+CREATE TABLE IF NOT EXISTS text_blobs (
+    hash TEXT PRIMARY KEY,
+    data BYTEA NOT NULL,
+    length INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
 -- Supabase table schema for text_analyses
 CREATE TABLE IF NOT EXISTS text_analyses (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-    text TEXT NOT NULL,
+    text_hash TEXT NOT NULL REFERENCES text_blobs (hash),
+    text_length INTEGER NOT NULL,
     summary TEXT NOT NULL,
     title TEXT,
     topics JSONB NOT NULL,
@@ -14,6 +23,8 @@ CREATE TABLE IF NOT EXISTS text_analyses (
     readability_score DECIMAL(5,2),
     word_count INTEGER,
     sentence_count INTEGER,
+    -- TextProcessor logic + spaCy model that produced the insights above (see reanalyze.py)
+    analyzer_version TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -22,3 +33,49 @@ CREATE INDEX IF NOT EXISTS idx_text_analyses_topics ON text_analyses USING GIN (
 CREATE INDEX IF NOT EXISTS idx_text_analyses_keywords ON text_analyses USING GIN (keywords);
 CREATE INDEX IF NOT EXISTS idx_text_analyses_sentiment ON text_analyses (sentiment);
 CREATE INDEX IF NOT EXISTS idx_text_analyses_created_at ON text_analyses (created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_text_analyses_text_hash ON text_analyses (text_hash);
+
+-- Batched write-back of recomputed local insights, used by reanalyze.py
+CREATE OR REPLACE FUNCTION update_analysis_insights(rows JSONB)
+RETURNS INTEGER
+LANGUAGE SQL
+AS $$
+    WITH updated AS (
+        UPDATE text_analyses AS t SET
+            keywords = r.keywords,
+            entities = r.entities,
+            phrases = r.phrases,
+            readability_score = r.readability_score,
+            word_count = r.word_count,
+            sentence_count = r.sentence_count,
+            analyzer_version = r.analyzer_version
+        FROM jsonb_to_recordset(rows) AS r(
+            id UUID,
+            keywords JSONB,
+            entities JSONB,
+            phrases JSONB,
+            readability_score DECIMAL(5,2),
+            word_count INTEGER,
+            sentence_count INTEGER,
+            analyzer_version TEXT
+        )
+        WHERE t.id = r.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
+
+-- Databases created before analyzer_version existed:
+--   ALTER TABLE text_analyses ADD COLUMN analyzer_version TEXT;
+
+-- Migrating a database created before text_blobs existed:
+--   1. Create text_blobs (above), then:
+--        ALTER TABLE text_analyses ALTER COLUMN text DROP NOT NULL;
+--        ALTER TABLE text_analyses ADD COLUMN text_hash TEXT REFERENCES text_blobs (hash);
+--        ALTER TABLE text_analyses ADD COLUMN text_length INTEGER;
+--   2. From the backend directory: python migrate_text_store.py
+--   3. Once it reports no rows left:
+--        ALTER TABLE text_analyses ALTER COLUMN text_hash SET NOT NULL;
+--        ALTER TABLE text_analyses ALTER COLUMN text_length SET NOT NULL;
+--        ALTER TABLE text_analyses DROP COLUMN text;
+--        CREATE INDEX IF NOT EXISTS idx_text_analyses_text_hash ON text_analyses (text_hash);
@@ -0,0 +1,244 @@
+"""
+Admission control for the expensive endpoints.
+
+Two independent checks run before a request reaches its handler:
+
+- A token bucket per client caps each caller's sustained request rate;
+  callers over their limit get 429 right away.
+- A global cap on in-flight requests, with a FIFO wait line in front of it.
+  The time requests spend waiting for a slot is watched CoDel-style: once it
+  stays above the target delay for a full interval, the limiter starts
+  shedding (503) instead of letting the line grow, and stops as soon as
+  waits drop back under target.
+
+Both reject with a Retry-After header. Paths that are not listed (e.g. /health)
+bypass the middleware entirely.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Collection, Deque, Dict, Optional, Tuple
+from starlette.responses import JSONResponse
+from config import config
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+class RateLimiter:
+    """Per-client token buckets, LRU-bounded so idle clients are forgotten"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def acquire(self, client: str) -> float:
+        """Take a token for client; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+            self._buckets.move_to_end(client)
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+class OverloadedError(Exception):
+    """Raised when the concurrency limiter sheds a request"""
+
+class ConcurrencyLimiter:
+    """
+    Caps in-flight requests and sheds load when queueing delay stays above target.
+    Slots are handed directly to the next waiter, so admission order is FIFO.
+    """
+
+    def __init__(self, max_in_flight: int, max_waiting: int, target_delay: float, interval: float):
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.target_delay = target_delay
+        self.interval = interval
+        self.in_flight = 0
+        self._waiters: Deque[Tuple[float, asyncio.Future]] = deque()
+
+        # CoDel state
+        self.dropping = False
+        self._first_above: Optional[float] = None
+        self._drop_next = 0.0
+        self._drop_count = 0
+
+        # Smoothed time requests hold a slot, used for Retry-After
+        self.service_time = 1.0
+        self.shed = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        """Wait for an in-flight slot; raises OverloadedError if the request is shed"""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        if self.dropping or len(self._waiters) >= self.max_waiting:
+            # Fail fast: waiting would only add to a queue that is already too long
+            self.shed += 1
+            raise OverloadedError()
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((time.monotonic(), future))
+        try:
+            admitted = await future
+        except asyncio.CancelledError:
+            # Client went away; pass the slot on if it had already been handed to us
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            raise
+        if not admitted:
+            self.shed += 1
+            raise OverloadedError()
+
+    def release(self, held_for: Optional[float] = None):
+        """Free a slot, handing it to the next waiter that should not be dropped"""
+        if held_for is not None:
+            self.service_time += 0.1 * (held_for - self.service_time)
+
+        now = time.monotonic()
+        while self._waiters:
+            enqueued, future = self._waiters.popleft()
+            if future.done():
+                continue
+            if self._should_drop(now - enqueued, now):
+                future.set_result(False)
+                continue
+            future.set_result(True)
+            return
+        self.in_flight -= 1
+        # An empty line means the standing queue is gone
+        self._first_above = None
+        self.dropping = False
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.service_time))
+
+    def _should_drop(self, sojourn: float, now: float) -> bool:
+        if sojourn < self.target_delay:
+            self._first_above = None
+            self.dropping = False
+            return False
+        if self._first_above is None:
+            self._first_above = now + self.interval
+            return False
+        if now < self._first_above:
+            return False
+        if not self.dropping:
+            # Delay has stayed above target for a whole interval
+            self.dropping = True
+            self._drop_count = 1
+            self._drop_next = now + self.interval / math.sqrt(self._drop_count)
+            return True
+        if now >= self._drop_next:
+            # CoDel control law: drop more often the longer the queue persists
+            self._drop_count += 1
+            self._drop_next = now + self.interval / math.sqrt(self._drop_count)
+            return True
+        return False
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware applying per-client rate limits to rate_limited paths and
+    the global in-flight cap to concurrency_limited paths (POST requests only).
+    """
+
+    def __init__(self, app, rate_limited: Collection[str] = (), concurrency_limited: Collection[str] = ()):
+        admission_config = config.get_admission_config()
+        self.app = app
+        self.rate_limited = set(rate_limited)
+        self.concurrency_limited = set(concurrency_limited)
+        self.trusted_proxies = admission_config["trusted_proxies"]
+        self.rate_limiter = RateLimiter(
+            admission_config["rate"], admission_config["burst"], admission_config["max_clients"]
+        )
+        self.limiter = ConcurrencyLimiter(
+            admission_config["max_in_flight"], admission_config["max_waiting"],
+            admission_config["target_delay"], admission_config["interval"]
+        )
+        self.rate_limited_count = 0
+        admission_control.middleware = self
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in self.rate_limited:
+            wait = self.rate_limiter.acquire(self._client(scope))
+            if wait:
+                self.rate_limited_count += 1
+                await self._reject(scope, receive, send, 429, "Rate limit exceeded", math.ceil(wait))
+                return
+
+        if path not in self.concurrency_limited:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.limiter.acquire()
+        except OverloadedError:
+            await self._reject(scope, receive, send, 503, "Server is overloaded, please retry", self.limiter.retry_after())
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(time.monotonic() - started)
+
+    def _client(self, scope) -> str:
+        """Client address, taken from X-Forwarded-For when behind trusted proxies"""
+        if self.trusted_proxies:
+            for name, value in scope["headers"]:
+                if name == b"x-forwarded-for":
+                    hops = [hop.strip() for hop in value.decode("latin-1").split(",")]
+                    # Each trusted proxy appends the address it received from; earlier entries can be forged
+                    return hops[max(0, len(hops) - self.trusted_proxies)]
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def _reject(self, scope, receive, send, status_code: int, detail: str, retry_after: int):
+        print(f"🚦 Admission: {status_code} for {scope['path']} ({detail})")
+        response = JSONResponse({"detail": detail}, status_code=status_code, headers={"Retry-After": str(retry_after)})
+        await response(scope, receive, send)
+
+class AdmissionControl:
+    """Handle for reading the installed middleware's state (e.g. from /health)"""
+
+    def __init__(self):
+        self.middleware: Optional[AdmissionControlMiddleware] = None
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.middleware:
+            return {}
+        limiter = self.middleware.limiter
+        return {
+            "in_flight": limiter.in_flight,
+            "waiting": limiter.waiting,
+            "shedding": limiter.dropping,
+            "shed": limiter.shed,
+            "rate_limited": self.middleware.rate_limited_count
+        }
+
+admission_control = AdmissionControl()
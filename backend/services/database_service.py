@@ -1,15 +1,36 @@
 from supabase import create_client, Client
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
 from datetime import datetime
 import uuid
 from config import config
+from services.text_store import text_hash, compress_text, decompress_text, to_bytea, from_bytea
+
+# Fields an analysis exposes through the API; list endpoints can project a subset
+ANALYSIS_FIELDS = (
+    "id", "summary", "title", "topics", "sentiment", "keywords", "confidence_score",
+    "entities", "phrases", "readability_score", "word_count", "sentence_count", "created_at"
+)
+
+# Hashes per in_() filter; each is 64 hex chars in the GET query string, so larger
+# batches run past the URL length limits of proxies in front of PostgREST
+TEXT_FETCH_BATCH = 100
 
 class DatabaseService:
     def __init__(self):
         self.supabase: Optional[Client] = None
         self.table_name = "text_analyses"
-        
+        self.blob_table_name = "text_blobs"
+        # Bumped on every successful write so cached reads can tell they are stale
+        self.data_version = 0
+        self.connect()
+    
+    def connect(self):
+        """
+        Create the Supabase client. Called again in each forked server worker
+        so processes never share HTTP connections.
+        """
+        self.supabase = None
         if config.is_supabase_available():
             try:
                 supabase_config = config.get_supabase_config()
@@ -18,7 +39,7 @@ class DatabaseService:
                     supabase_config["api_key"]
                 )
                 # Test the connection
-                result = self.supabase.table(self.table_name).select("*").limit(1).execute()
+                result = self.supabase.table(self.table_name).select("id").limit(1).execute()
                 print("✅ Supabase connected successfully")
             except Exception as e:
                 print(f"⚠️  Supabase connection failed: {e}")
@@ -27,6 +48,108 @@ class DatabaseService:
         else:
             print("⚠️  Supabase not configured, running in demo mode")
     
+    def _format_analysis(self, item: Dict[str, Any], fields: Sequence[str] = ANALYSIS_FIELDS) -> Dict[str, Any]:
+        """
+        Shape a database row into the analysis dict returned by the API,
+        keeping only the requested fields
+        """
+        analysis = {}
+        for field in fields:
+            value = item.get(field)
+            if field in ("topics", "keywords", "phrases"):
+                value = value or []
+            elif field == "entities":
+                value = value or {}
+            elif field == "confidence_score":
+                value = float(value) if value is not None else None
+            elif field == "readability_score":
+                value = float(value) if value else None
+            analysis[field] = value
+        return analysis
+    
+    def _select_columns(self, fields: Sequence[str], *extra: str) -> str:
+        """
+        Build the select() column list for a projection plus any columns needed for filtering
+        """
+        return ",".join(dict.fromkeys([*fields, *extra]))
+    
+    def save_text(self, text: str) -> Tuple[str, int]:
+        """
+        Store raw text zstd-compressed under its content hash and return (hash, length).
+        Identical texts map to the same blob, so duplicates are stored once.
+        """
+        return self.save_texts([text])[0]
+    
+    def save_texts(self, texts: List[str]) -> List[Tuple[str, int]]:
+        """
+        Store many raw texts in one multi-row upsert; returns (hash, length) per text
+        """
+        addresses = [(text_hash(text), len(text)) for text in texts]
+        blobs = {}
+        for text, (digest, length) in zip(texts, addresses):
+            if digest not in blobs:
+                blobs[digest] = {"hash": digest, "data": to_bytea(compress_text(text)), "length": length}
+        self.supabase.table(self.blob_table_name).upsert(list(blobs.values()), on_conflict="hash", ignore_duplicates=True).execute()
+        return addresses
+    
+    def _analysis_row(self, analysis_id: str, analysis_data: Dict[str, Any], digest: str, text_length: int) -> Dict[str, Any]:
+        """
+        Prepare an analysis for insertion into Supabase
+        """
+        return {
+            "id": analysis_id,
+            "text_hash": digest,
+            "text_length": text_length,
+            "summary": analysis_data["summary"],
+            "title": analysis_data.get("title"),
+            "topics": analysis_data["topics"],  # Supabase handles JSON automatically
+            "sentiment": analysis_data["sentiment"],
+            "keywords": analysis_data["keywords"],  # Supabase handles JSON automatically
+            "confidence_score": float(analysis_data["confidence_score"]),
+            "entities": analysis_data.get("entities", {}),
+            "phrases": analysis_data.get("phrases", []),
+            "readability_score": float(analysis_data.get("readability_score", 0)) if analysis_data.get("readability_score") else None,
+            "word_count": analysis_data.get("word_count"),
+            "sentence_count": analysis_data.get("sentence_count"),
+            "analyzer_version": analysis_data.get("analyzer_version"),
+            "created_at": datetime.utcnow().isoformat()
+        }
+    
+    def save_analyses(self, analyses: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save many analyses with one multi-row insert per table; returns their ids.
+        Unlike save_analysis, failures raise so callers can report them per record.
+        """
+        analysis_ids = [str(uuid.uuid4()) for _ in analyses]
+        if not self.supabase or not analyses:
+            return analysis_ids
+        
+        addresses = self.save_texts([analysis["text"] for analysis in analyses])
+        rows = [
+            self._analysis_row(analysis_id, analysis, digest, length)
+            for analysis_id, analysis, (digest, length) in zip(analysis_ids, analyses, addresses)
+        ]
+        result = self.supabase.table(self.table_name).insert(rows).execute()
+        if not result.data or len(result.data) != len(rows):
+            raise Exception("Failed to save analyses to database")
+        self.data_version += 1
+        return analysis_ids
+    
+    def get_texts(self, hashes: List[str]) -> Dict[str, str]:
+        """
+        Fetch and decompress raw texts by content hash, TEXT_FETCH_BATCH per request
+        """
+        if not self.supabase or not hashes:
+            return {}
+        unique = list(dict.fromkeys(hashes))
+        texts = {}
+        for start in range(0, len(unique), TEXT_FETCH_BATCH):
+            batch = unique[start:start + TEXT_FETCH_BATCH]
+            result = self.supabase.table(self.blob_table_name).select("hash, data").in_("hash", batch).execute()
+            for row in result.data or []:
+                texts[row["hash"]] = decompress_text(from_bytea(row["data"]))
+        return texts
+    
     async def save_analysis(self, analysis_data: Dict[str, Any]) -> str:
         """
         Save analysis data to Supabase
@@ -38,28 +161,16 @@ class DatabaseService:
             return analysis_id
             
         try:
-            # Prepare data for Supabase
-            data = {
-                "id": analysis_id,
-                "text": analysis_data["text"],
-                "summary": analysis_data["summary"],
-                "title": analysis_data.get("title"),
-                "topics": analysis_data["topics"],  # Supabase handles JSON automatically
-                "sentiment": analysis_data["sentiment"],
-                "keywords": analysis_data["keywords"],  # Supabase handles JSON automatically
-                "confidence_score": float(analysis_data["confidence_score"]),
-                "entities": analysis_data.get("entities", {}),
-                "phrases": analysis_data.get("phrases", []),
-                "readability_score": float(analysis_data.get("readability_score", 0)) if analysis_data.get("readability_score") else None,
-                "word_count": analysis_data.get("word_count"),
-                "sentence_count": analysis_data.get("sentence_count"),
-                "created_at": datetime.utcnow().isoformat()
-            }
+            # Raw text goes to the content-addressed store; the row keeps only its hash
+            digest, text_length = self.save_text(analysis_data["text"])
+            
+            data = self._analysis_row(analysis_id, analysis_data, digest, text_length)
             
             print(f"💾 Saving analysis to database: {analysis_id}")
             result = self.supabase.table(self.table_name).insert(data).execute()
             
             if result.data and len(result.data) > 0:
+                self.data_version += 1
                 print(f"✅ Analysis saved successfully: {analysis_id}")
                 return analysis_id
             else:
@@ -71,7 +182,7 @@ class DatabaseService:
             print("⚠️  Returning mock ID for demo")
             return analysis_id
     
-    async def search_analyses(self, topic: Optional[str] = None, keyword: Optional[str] = None, sentiment: Optional[str] = None, sortBy: Optional[str] = "newest") -> List[Dict[str, Any]]:
+    async def search_analyses(self, topic: Optional[str] = None, keyword: Optional[str] = None, sentiment: Optional[str] = None, sortBy: Optional[str] = "newest", fields: Sequence[str] = ANALYSIS_FIELDS) -> List[Dict[str, Any]]:
         """
         Search analyses by topic or keyword
         """
@@ -80,17 +191,19 @@ class DatabaseService:
             return []
             
         try:
+            search_term = topic or keyword
+            search_field = "topics" if topic else "keywords"
+            
             # Get all analyses first, then filter in Python
             # This is more reliable than complex Supabase JSON queries
-            result = self.supabase.table(self.table_name).select("*").order("created_at", desc=True).execute()
+            columns = self._select_columns(fields, search_field, "sentiment", "created_at")
+            result = self.supabase.table(self.table_name).select(columns).order("created_at", desc=True).execute()
             
             if not result.data:
                 print(f"🔍 No analyses found in database")
                 return []
             
             analyses = []
-            search_term = topic or keyword
-            search_field = "topics" if topic else "keywords"
             
             for item in result.data:
                 # Check if search term exists in the specified field
@@ -108,22 +221,7 @@ class DatabaseService:
                     sentiment_matches = item.get("sentiment", "").lower() == sentiment.lower()
                 
                 if matches and sentiment_matches:
-                    analysis = {
-                        "id": item["id"],
-                        "summary": item["summary"],
-                        "title": item.get("title"),
-                        "topics": item.get("topics", []),
-                        "sentiment": item["sentiment"],
-                        "keywords": item.get("keywords", []),
-                        "confidence_score": float(item["confidence_score"]),
-                        "entities": item.get("entities", {}),
-                        "phrases": item.get("phrases", []),
-                        "readability_score": float(item.get("readability_score")) if item.get("readability_score") else None,
-                        "word_count": item.get("word_count"),
-                        "sentence_count": item.get("sentence_count"),
-                        "created_at": item["created_at"]
-                    }
-                    analyses.append(analysis)
+                    analyses.append(item)
             
             # Apply sorting
             if sortBy == "oldest":
@@ -134,6 +232,8 @@ class DatabaseService:
                 analyses.sort(key=lambda x: sentiment_order.get(x["sentiment"], 3))
             # Default is "newest" which is already sorted by created_at desc from the query
             
+            analyses = [self._format_analysis(item, fields) for item in analyses]
+            
             print(f"🔍 Found {len(analyses)} analyses matching '{search_term}' in {search_field}" + 
                   (f" with sentiment '{sentiment}'" if sentiment and sentiment != "all" else "") +
                   f" sorted by {sortBy}")
@@ -144,7 +244,7 @@ class DatabaseService:
             # Return empty list instead of crashing
             return []
     
-    async def get_all_analyses(self) -> List[Dict[str, Any]]:
+    async def get_all_analyses(self, fields: Sequence[str] = ANALYSIS_FIELDS) -> List[Dict[str, Any]]:
         """
         Get all analyses ordered by creation date
         """
@@ -154,7 +254,7 @@ class DatabaseService:
             
         try:
             print("📊 Fetching all analyses from database...")
-            result = self.supabase.table(self.table_name).select("*").order("created_at", desc=True).execute()
+            result = self.supabase.table(self.table_name).select(self._select_columns(fields)).order("created_at", desc=True).execute()
             
             # Check if result has data
             if not result.data:
@@ -163,21 +263,7 @@ class DatabaseService:
             
             analyses = []
             for item in result.data:
-                analysis = {
-                    "id": item["id"],
-                    "summary": item["summary"],
-                    "title": item.get("title"),
-                    "topics": item.get("topics", []),
-                    "sentiment": item["sentiment"],
-                    "keywords": item.get("keywords", []),
-                    "confidence_score": float(item["confidence_score"]),
-                    "entities": item.get("entities", {}),
-                    "phrases": item.get("phrases", []),
-                    "readability_score": float(item.get("readability_score")) if item.get("readability_score") else None,
-                    "word_count": item.get("word_count"),
-                    "sentence_count": item.get("sentence_count"),
-                    "created_at": item["created_at"]
-                }
+                analysis = self._format_analysis(item, fields)
                 analyses.append(analysis)
             
             print(f"📊 Retrieved {len(analyses)} analyses from database")
@@ -187,3 +273,52 @@ class DatabaseService:
             print(f"❌ Database fetch error: {str(e)}")
             # Return empty list instead of crashing
             return []
+    
+    async def get_analyses_by_ids(self, analysis_ids: List[str], fields: Sequence[str] = ANALYSIS_FIELDS) -> List[Dict[str, Any]]:
+        """
+        Get analyses by id, returned in the same order as analysis_ids
+        """
+        if not self.supabase or not analysis_ids:
+            return []
+            
+        try:
+            result = self.supabase.table(self.table_name).select(self._select_columns(fields, "id")).in_("id", analysis_ids).execute()
+            by_id = {item["id"]: self._format_analysis(item, fields) for item in (result.data or [])}
+            return [by_id[analysis_id] for analysis_id in analysis_ids if analysis_id in by_id]
+            
+        except Exception as e:
+            print(f"❌ Database fetch by ids error: {str(e)}")
+            return []
+    
+    def update_insights(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write recomputed local insights back for many analyses in one round trip.
+        Each row needs id, keywords, entities, phrases, readability_score,
+        word_count, sentence_count and analyzer_version. Returns rows updated.
+        """
+        if not self.supabase or not rows:
+            return 0
+        result = self.supabase.rpc("update_analysis_insights", {"rows": rows}).execute()
+        self.data_version += 1
+        return result.data or 0
+    
+    def iter_analyses(self, columns: str = "*", chunk_size: int = 500, after_id: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream raw rows in chunks using keyset pagination on id.
+        Each query is bounded by chunk_size, so memory stays flat for large tables.
+        """
+        if not self.supabase:
+            return
+        
+        last_id = after_id
+        while True:
+            query = self.supabase.table(self.table_name).select(columns).order("id").limit(chunk_size)
+            if last_id:
+                query = query.gt("id", last_id)
+            rows = query.execute().data or []
+            if not rows:
+                return
+            yield rows
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1]["id"]
@@ -0,0 +1,364 @@
+"""
+Streaming bulk ingestion of JSONL/CSV corpora.
+
+Records are parsed lazily, one line at a time, and flow through three stages
+connected by bounded queues:
+
+    reader  -> spaCy insights in batches (off the event loop)
+    llm     -> a fixed pool of concurrent LLM calls
+    writer  -> multi-row inserts, then related-analyses and suggestion indexing
+
+A full queue blocks the stage feeding it, so memory stays constant no matter
+how large the input is.
+"""
+import asyncio
+import codecs
+import csv
+import json
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from config import config
+from services.suggest_index import SuggestIndex
+from services.vector_index import VectorIndex
+
+FORMATS = ("jsonl", "csv")
+
+# (line number, text, parse error); exactly one of text / error is set
+Record = Tuple[int, Optional[str], Optional[str]]
+
+def combine_analysis(text: str, insights: Dict[str, Any], llm_analysis: Dict[str, Any], analyzer_version: str) -> Dict[str, Any]:
+    """Merge spaCy insights and the LLM analysis into the record save_analysis expects"""
+    return {
+        "text": text,
+        "summary": llm_analysis["summary"],
+        "title": llm_analysis.get("title"),
+        "topics": llm_analysis["topics"],
+        "sentiment": llm_analysis["sentiment"],
+        "keywords": insights["keywords"],
+        "confidence_score": llm_analysis.get("confidence_score", 0.8),
+        "entities": insights.get("entities"),
+        "phrases": insights.get("phrases"),
+        "readability_score": insights.get("readability_score"),
+        "word_count": insights.get("word_count"),
+        "sentence_count": insights.get("sentence_count"),
+        "analyzer_version": analyzer_version
+    }
+
+def format_for_path(path: str) -> str:
+    """Infer the input format from a file extension"""
+    for fmt in FORMATS:
+        if path.lower().endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Cannot infer format of {path}; expected one of: {', '.join(FORMATS)}")
+
+# A quoted CSV field may span lines, but an unterminated quote must not buffer
+# the rest of the file; past these limits the record is reported as invalid
+MAX_CSV_RECORD_LINES = 1000
+MAX_CSV_RECORD_CHARS = 1_000_000
+
+class RecordParser:
+    """
+    Incremental JSONL/CSV parser fed one line at a time.
+
+    JSONL lines may hold an object (text is read from text_field) or a bare
+    string. CSV needs a header row naming text_field; quoted fields may span
+    lines, up to MAX_CSV_RECORD_LINES / MAX_CSV_RECORD_CHARS per record.
+    """
+
+    def __init__(self, fmt: str, text_field: str = "text"):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.fmt = fmt
+        self.text_field = text_field
+        self.line_no = 0
+        self._header: Optional[List[str]] = None
+        # Lines of a CSV record still waiting for its closing quote, as (line number, line)
+        self._buffer: List[Tuple[int, str]] = []
+        self._buffer_chars = 0
+
+    def feed(self, line: str) -> Iterator[Record]:
+        self.line_no += 1
+        if self.fmt == "jsonl":
+            yield from self._parse_jsonl(line)
+        else:
+            yield from self._feed_csv(self.line_no, line)
+
+    def close(self) -> Iterator[Record]:
+        """Flush a trailing CSV record left open by an unterminated quote"""
+        while self._buffer:
+            yield from self._drop_unterminated()
+
+    def _parse_jsonl(self, line: str) -> Iterator[Record]:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield self.line_no, None, f"Invalid JSON: {e.msg}"
+            return
+        text = value.get(self.text_field) if isinstance(value, dict) else value
+        yield self._checked(self.line_no, text)
+
+    def _feed_csv(self, line_no: int, line: str) -> Iterator[Record]:
+        self._buffer.append((line_no, line))
+        self._buffer_chars += len(line)
+        lines = [buffered for _, buffered in self._buffer]
+        try:
+            # Strict mode tells an open quoted field apart from a complete record
+            row = next(csv.reader(lines, strict=True), None)
+        except csv.Error as e:
+            if "unexpected end of data" in str(e):
+                if len(self._buffer) > MAX_CSV_RECORD_LINES or self._buffer_chars > MAX_CSV_RECORD_CHARS:
+                    yield from self._drop_unterminated()
+                return
+            # Complete but malformed (e.g. text after a closing quote); parse leniently
+            row = next(csv.reader(lines), None)
+
+        start = self._buffer[0][0]
+        self._buffer, self._buffer_chars = [], 0
+        if row:
+            yield from self._handle_csv_row(row, start)
+
+    def _drop_unterminated(self) -> Iterator[Record]:
+        """Report the record opened by the first buffered line and re-read the lines after it"""
+        (line_no, _), rest = self._buffer[0], self._buffer[1:]
+        self._buffer, self._buffer_chars = [], 0
+        yield line_no, None, "Invalid CSV: unterminated quoted field"
+        for replay_no, line in rest:
+            yield from self._feed_csv(replay_no, line)
+
+    def _handle_csv_row(self, row: List[str], line_no: int) -> Iterator[Record]:
+        if self._header is None:
+            self._header = row
+            if self.text_field not in row:
+                raise ValueError(f"CSV header has no '{self.text_field}' column")
+            return
+        values = dict(zip(self._header, row))
+        yield self._checked(line_no, values.get(self.text_field))
+
+    def _checked(self, line_no: int, text: Any) -> Record:
+        if not isinstance(text, str) or not text.strip():
+            return line_no, None, f"Missing or empty '{self.text_field}'"
+        return line_no, text, None
+
+def iter_records(lines: Iterable[str], fmt: str, text_field: str = "text") -> Iterator[Record]:
+    """Lazily parse records from an iterable of lines (e.g. an open file)"""
+    parser = RecordParser(fmt, text_field)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+async def aiter_records(chunks: AsyncIterable[bytes], fmt: str, text_field: str = "text") -> AsyncIterator[Record]:
+    """Lazily parse records from a stream of raw bytes (e.g. a request body)"""
+    parser = RecordParser(fmt, text_field)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            for record in parser.feed(line + "\n"):
+                yield record
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        for record in parser.feed(pending):
+            yield record
+    for record in parser.close():
+        yield record
+
+class IngestionStats:
+    """Running counters for an ingestion run; errors beyond max_errors are only counted"""
+
+    def __init__(self, max_errors: int = 100):
+        self.max_errors = max_errors
+        self.received = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.monotonic()
+
+    def record_error(self, line_no: int, error: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line_no, "error": error})
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "received": self.received,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 2),
+            "records_per_second": round(self.processed / max(elapsed, 1e-9), 2),
+            "errors": self.errors
+        }
+
+_DONE = object()
+
+class IngestionPipeline:
+    """
+    Bounded-memory ingestion pipeline: batched local insights, concurrent LLM
+    calls and batched database writes, with backpressure between stages.
+    """
+
+    def __init__(self, text_processor, llm_service, db_service, vector_index: Optional[VectorIndex] = None,
+                 suggest_index: Optional[SuggestIndex] = None, on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        ingestion_config = config.get_ingestion_config()
+        self.text_processor = text_processor
+        self.llm_service = llm_service
+        self.db_service = db_service
+        self.vector_index = vector_index
+        self.suggest_index = suggest_index
+        self.on_progress = on_progress
+        self.llm_concurrency = ingestion_config["llm_concurrency"]
+        self.insight_batch = ingestion_config["insight_batch"]
+        self.write_batch = ingestion_config["write_batch"]
+        self.queue_size = ingestion_config["queue_size"]
+        self.progress_every = ingestion_config["progress_every"]
+        self.max_errors = ingestion_config["max_errors"]
+
+    async def run(self, records: Union[Iterable[Record], AsyncIterable[Record]]) -> Dict[str, Any]:
+        """Ingest all records and return a summary with per-record errors"""
+        stats = IngestionStats(self.max_errors)
+        self._last_progress = 0
+        llm_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+
+        async def llm_stage():
+            workers = [asyncio.create_task(self._llm_worker(llm_queue, write_queue, stats)) for _ in range(self.llm_concurrency)]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for task in workers:
+                    task.cancel()
+            await write_queue.put(_DONE)
+
+        stages = [
+            asyncio.create_task(self._reader(records, llm_queue, stats)),
+            asyncio.create_task(llm_stage()),
+            asyncio.create_task(self._writer(write_queue, stats))
+        ]
+        try:
+            await asyncio.gather(*stages)
+        finally:
+            # One stage failing must not leave the others blocked on a queue
+            for task in stages:
+                task.cancel()
+            if self.vector_index is not None:
+                # Flushing rewrites the index files under the file lock
+                await asyncio.get_running_loop().run_in_executor(None, self.vector_index.flush)
+
+        summary = stats.summary()
+        self._report(stats, force=True)
+        return summary
+
+    async def _reader(self, records, llm_queue: asyncio.Queue, stats: IngestionStats):
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[str, int]] = []
+
+        async def flush_batch():
+            # nlp.pipe over the whole batch; runs in a thread so LLM calls keep flowing
+            results = await loop.run_in_executor(None, lambda: list(self.text_processor.get_advanced_insights_batch(batch)))
+            batch.clear()
+            for insights, (line_no, text) in results:
+                await llm_queue.put((line_no, text, insights))
+
+        async for line_no, text, error in _aiter(records):
+            stats.received += 1
+            if error:
+                stats.record_error(line_no, error)
+                self._report(stats)
+                continue
+            batch.append((text, (line_no, text)))
+            if len(batch) >= self.insight_batch:
+                await flush_batch()
+        if batch:
+            await flush_batch()
+
+        for _ in range(self.llm_concurrency):
+            await llm_queue.put(_DONE)
+
+    async def _llm_worker(self, llm_queue: asyncio.Queue, write_queue: asyncio.Queue, stats: IngestionStats):
+        analyzer_version = self.text_processor.analyzer_version
+        while True:
+            item = await llm_queue.get()
+            if item is _DONE:
+                return
+            line_no, text, insights = item
+            try:
+                llm_analysis = await self.llm_service.analyze_text(text, insights.get("sentences"))
+                analysis_data = combine_analysis(text, insights, llm_analysis, analyzer_version)
+            except Exception as e:
+                stats.record_error(line_no, f"Analysis failed: {str(e)}")
+                self._report(stats)
+                continue
+            await write_queue.put((line_no, analysis_data, insights.get("lemmas", [])))
+
+    async def _writer(self, write_queue: asyncio.Queue, stats: IngestionStats):
+        batch: List[Tuple[int, Dict[str, Any], List[str]]] = []
+        while True:
+            item = await write_queue.get()
+            if item is not _DONE:
+                batch.append(item)
+            if batch and (item is _DONE or len(batch) >= self.write_batch):
+                await self._write(batch, stats)
+                batch = []
+                self._report(stats)
+            if item is _DONE:
+                return
+
+    async def _write(self, batch: List[Tuple[int, Dict[str, Any], List[str]]], stats: IngestionStats):
+        loop = asyncio.get_running_loop()
+        try:
+            analysis_ids = await loop.run_in_executor(None, self.db_service.save_analyses, [analysis for _, analysis, _ in batch])
+            saved = list(zip(batch, analysis_ids))
+        except Exception as e:
+            # Retry row by row so one bad record does not fail its whole batch
+            print(f"⚠️  Ingest: batch insert of {len(batch)} failed ({str(e)}), retrying individually")
+            saved = []
+            for item in batch:
+                try:
+                    analysis_ids = await loop.run_in_executor(None, self.db_service.save_analyses, [item[1]])
+                    saved.append((item, analysis_ids[0]))
+                except Exception as row_error:
+                    stats.record_error(item[0], f"Save failed: {str(row_error)}")
+
+        for (line_no, analysis, lemmas), analysis_id in saved:
+            stats.succeeded += 1
+            if self.suggest_index is not None:
+                self.suggest_index.add_analysis(analysis, analysis_id)
+        if self.vector_index is not None and saved:
+            # Index the whole batch in one thread hop; adds take the index's file lock
+            await loop.run_in_executor(None, self._index, saved)
+
+    def _index(self, saved: List[Tuple[Tuple[int, Dict[str, Any], List[str]], str]]):
+        for (line_no, analysis, lemmas), analysis_id in saved:
+            try:
+                self.vector_index.add(analysis_id, VectorIndex.build_terms(lemmas, analysis["keywords"], analysis.get("phrases")))
+            except Exception as e:
+                print(f"⚠️  Ingest: vector indexing failed for line {line_no}: {str(e)}")
+
+    def _report(self, stats: IngestionStats, force: bool = False):
+        if not force and stats.processed - self._last_progress < self.progress_every:
+            return
+        self._last_progress = stats.processed
+        summary = stats.summary()
+        if self.on_progress:
+            self.on_progress(summary)
+        else:
+            print(f"📥 Ingest: {stats.processed} processed ({stats.succeeded} ok, {stats.failed} failed), "
+                  f"{summary['records_per_second']}/s")
+
+async def _aiter(records: Union[Iterable[Record], AsyncIterable[Record]]) -> AsyncIterator[Record]:
+    if hasattr(records, "__aiter__"):
+        async for record in records:
+            yield record
+    else:
+        for record in records:
+            yield record
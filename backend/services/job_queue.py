@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from config import config
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit"""
+
+class JobQueue:
+    """
+    Durable SQLite-backed job queue with a pool of asyncio workers.
+
+    Jobs move through queued -> running -> succeeded/failed. Because state lives
+    in SQLite, queued jobs survive a restart. A running job holds a lease that
+    its worker renews while the handler runs; jobs whose lease has expired (their
+    process died) are re-queued until they run out of attempts. Live jobs of
+    other server processes sharing the file are never touched. On a clean stop,
+    running jobs get shutdown_timeout seconds to finish; any still running are
+    cancelled and re-queued at once without using up an attempt.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[Any]], db_path: Optional[str] = None):
+        queue_config = config.get_job_queue_config()
+        self.handler = handler
+        self.db_path = db_path or queue_config["db_path"]
+        self.num_workers = queue_config["workers"]
+        self.max_depth = queue_config["max_depth"]
+        self.max_attempts = queue_config["max_attempts"]
+        self.lease_seconds = queue_config["lease_seconds"]
+        self.shutdown_timeout = queue_config["shutdown_timeout"]
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Return this process's connection, opening it on first use.
+        SQLite connections must not cross fork(), so each worker opens its own.
+        """
+        if self._conn is None or self._conn_pid != os.getpid():
+            self._conn = self._connect()
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                owner_pid INTEGER,
+                lease_expires REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Queue files created before leases existed
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        if "owner_pid" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner_pid INTEGER")
+        if "lease_expires" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires REAL")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at)")
+        return conn
+
+    def depth(self) -> int:
+        """Number of jobs waiting or in progress"""
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()
+        return row[0]
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> str:
+        """
+        Enqueue a job and return its id. Raises QueueFullError past max_depth.
+        """
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                depth = db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+                if depth >= self.max_depth:
+                    raise QueueFullError(f"Job queue is full ({depth} jobs pending)")
+                db.execute(
+                    "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                    (job_id, kind, json.dumps(payload), now, now)
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+        if self._wakeup:
+            self._wakeup.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job's status and result, or None if it does not exist"""
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT id, kind, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def start(self):
+        """Recover jobs with expired leases and start the worker pool"""
+        self._recover()
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.num_workers)]
+        print(f"👷 Job queue started with {self.num_workers} workers ({self.depth()} jobs pending)")
+
+    async def stop(self):
+        """
+        Stop workers, letting running jobs finish within shutdown_timeout.
+        Jobs cut short are handed back to the queue right away.
+        """
+        # wait_for() can swallow a cancel that races with a wakeup, so also signal via a flag
+        self._stopping = True
+        if self._wakeup:
+            # Idle workers exit now; busy ones exit after their current job
+            self._wakeup.set()
+        if self._workers:
+            _, unfinished = await asyncio.wait(self._workers, timeout=self.shutdown_timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._release()
+
+    def _release(self):
+        """Re-queue this process's running jobs, refunding the attempt they were charged"""
+        with self._lock:
+            db = self._db()
+            released = db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), owner_pid = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = 'running' AND owner_pid = ?",
+                (time.time(), os.getpid())
+            ).rowcount
+        if released:
+            print(f"🔁 Re-queued {released} jobs interrupted by shutdown")
+
+    def _recover(self):
+        """Re-queue running jobs whose worker stopped renewing the lease"""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                # A NULL lease comes from a queue file written before leases existed
+                expired = "status = 'running' AND (lease_expires IS NULL OR lease_expires < ?)"
+                db.execute(
+                    f"UPDATE jobs SET status = 'failed', error = 'Exceeded max attempts', owner_pid = NULL, updated_at = ? WHERE {expired} AND attempts >= ?",
+                    (now, now, self.max_attempts)
+                )
+                recovered = db.execute(
+                    f"UPDATE jobs SET status = 'queued', owner_pid = NULL, lease_expires = NULL, updated_at = ? WHERE {expired}",
+                    (now, now)
+                ).rowcount
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        if recovered:
+            print(f"🔁 Re-queued {recovered} interrupted jobs")
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        with self._lock:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT id, kind, payload FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row:
+                    now = time.time()
+                    db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner_pid = ?, lease_expires = ?, updated_at = ? WHERE id = ?",
+                        (os.getpid(), now + self.lease_seconds, now, row["id"])
+                    )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id)
+            )
+
+    def _renew(self, job_id: str):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'running' AND owner_pid = ?",
+                (time.time() + self.lease_seconds, job_id, os.getpid())
+            )
+
+    async def _heartbeat(self, job_id: str):
+        """Keep a running job's lease alive until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            self._renew(job_id)
+
+    async def _worker(self, worker_id: int):
+        last_recovery = time.monotonic()
+        while not self._stopping:
+            if time.monotonic() - last_recovery > self.lease_seconds:
+                # Pick up jobs orphaned by a worker that died after we started
+                self._recover()
+                last_recovery = time.monotonic()
+            job = self._claim()
+            if not job:
+                self._wakeup.clear()
+                try:
+                    # Poll occasionally in case another process enqueued work
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            print(f"👷 Worker {worker_id}: running job {job['id']}")
+            heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+            try:
+                result = await self.handler({"kind": job["kind"], **json.loads(job["payload"])})
+                self._finish(job["id"], "succeeded", result=result)
+                print(f"✅ Worker {worker_id}: job {job['id']} succeeded")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Worker {worker_id}: job {job['id']} failed: {str(e)}")
+                self._finish(job["id"], "failed", error=str(e))
+            finally:
+                heartbeat.cancel()
@@ -1,21 +1,41 @@
 import openai
 import json
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, Sequence, Tuple
 from config import config
+from services.prompt_compressor import CompressedPrompt, PromptCompressor
 
 class LLMService:
     def __init__(self):
         self.client: Optional[openai.AsyncOpenAI] = None
-        
+        openai_config = config.get_openai_config()
+        # The compressor also counts tokens of uncompressed prompts, for comparison
+        self.compress_prompts: bool = openai_config["prompt_compression"]
+        self.compressor = PromptCompressor(openai_config["model"], openai_config["prompt_token_budget"])
+        # Running totals per prompt kind, to compare latency with and without compression
+        self.prompt_stats = {
+            kind: {"calls": 0, "original_tokens": 0, "prompt_tokens": 0, "latency_ms": 0.0}
+            for kind in ("compressed", "full")
+        }
+        self.connect()
+    
+    def connect(self):
+        """
+        Create the OpenAI client. Called again in each forked server worker
+        so processes never share HTTP connections.
+        """
+        self.client = None
         if config.is_openai_available():
             openai_config = config.get_openai_config()
             self.client = openai.AsyncOpenAI(api_key=openai_config["api_key"])
         else:
             print("⚠️  OpenAI not available, running in demo mode")
     
-    async def analyze_text(self, text: str) -> Dict[str, Any]:
+    async def analyze_text(self, text: str, sentences: Optional[Sequence[Tuple[str, float]]] = None) -> Dict[str, Any]:
         """
-        Analyze text using OpenAI GPT to extract summary, topics, and sentiment
+        Analyze text using OpenAI GPT to extract summary, topics, and sentiment.
+        Pass the ranked sentences from TextProcessor to let long texts be
+        compressed to the prompt token budget first.
         """
         if not self.client:
             # Return mock analysis when OpenAI is not available
@@ -23,10 +43,12 @@ class LLMService:
         
         try:
             openai_config = config.get_openai_config()
+            excerpt = self._compress(text, sentences)
+            label = "Text (key sentences excerpted from a longer document; [...] marks omissions)" if excerpt.compressed else "Text"
             prompt = f"""
             Analyze the following text and provide a structured response in JSON format:
             
-            Text: "{text}"
+            {label}: "{excerpt.text}"
             
             Please provide:
             1. A 1-2 sentence summary
@@ -45,6 +67,7 @@ class LLMService:
             }}
             """
             
+            started = time.perf_counter()
             response = await self.client.chat.completions.create(
                 model=openai_config["model"],
                 messages=[
@@ -55,6 +78,8 @@ class LLMService:
                 max_tokens=openai_config["max_tokens"]
             )
             
+            self._record_call(excerpt, (time.perf_counter() - started) * 1000)
+            
             content = response.choices[0].message.content.strip()
             
             # Parse JSON response
@@ -76,6 +101,41 @@ class LLMService:
             print(f"LLM API error: {str(e)}")
             return self._get_mock_analysis(text)
     
+    def _compress(self, text: str, sentences: Optional[Sequence[Tuple[str, float]]]) -> CompressedPrompt:
+        if not self.compress_prompts:
+            tokens = self.compressor.count_tokens(text)
+            return CompressedPrompt(text, tokens, tokens, 0.0)
+        excerpt = self.compressor.compress(text, sentences or [])
+        if excerpt.compressed:
+            print(f"🗜️  LLM: Prompt text compressed {excerpt.original_tokens} -> {excerpt.tokens} tokens "
+                  f"({excerpt.ratio:.0%}) in {excerpt.elapsed_ms:.1f} ms")
+        return excerpt
+    
+    def _record_call(self, excerpt: CompressedPrompt, latency_ms: float):
+        stats = self.prompt_stats["compressed" if excerpt.compressed else "full"]
+        stats["calls"] += 1
+        stats["original_tokens"] += excerpt.original_tokens
+        stats["prompt_tokens"] += excerpt.tokens
+        stats["latency_ms"] += latency_ms
+        print(f"⏱️  LLM: {excerpt.tokens}-token text answered in {latency_ms:.0f} ms")
+    
+    def get_prompt_stats(self) -> Dict[str, Any]:
+        """
+        Average text tokens and OpenAI latency for compressed and full prompts
+        """
+        summary = {}
+        for kind, stats in self.prompt_stats.items():
+            calls = stats["calls"]
+            summary[kind] = {
+                "calls": calls,
+                "avg_original_tokens": round(stats["original_tokens"] / calls, 1) if calls else None,
+                "avg_prompt_tokens": round(stats["prompt_tokens"] / calls, 1) if calls else None,
+                "avg_latency_ms": round(stats["latency_ms"] / calls, 1) if calls else None
+            }
+        compressed = self.prompt_stats["compressed"]
+        summary["compression_ratio"] = round(compressed["prompt_tokens"] / compressed["original_tokens"], 3) if compressed["original_tokens"] else None
+        return summary
+    
     def _get_mock_analysis(self, text: str) -> Dict[str, Any]:
         """Generate a mock analysis when OpenAI is not available"""
         # Simple mock analysis based on text content
@@ -0,0 +1,99 @@
+import time
+from typing import List, NamedTuple, Sequence, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Marks the places where sentences were left out of the excerpt
+GAP = " [...] "
+
+class CompressedPrompt(NamedTuple):
+    text: str
+    original_tokens: int
+    tokens: int
+    elapsed_ms: float
+
+    @property
+    def ratio(self) -> float:
+        return self.tokens / self.original_tokens if self.original_tokens else 1.0
+
+    @property
+    def compressed(self) -> bool:
+        return self.tokens < self.original_tokens
+
+class PromptCompressor:
+    """
+    Shrinks text to a token budget before it is sent to the LLM.
+
+    Sentences are picked greedily in order of the salience scores computed by
+    TextProcessor.rank_sentences until the budget is used up, then put back in
+    document order. Token counts come from the model's own tokenizer (tiktoken).
+    """
+
+    def __init__(self, model: str, token_budget: int):
+        self.token_budget = token_budget
+        self.encoding = None
+        if not tiktoken:
+            print("⚠️  tiktoken not installed, estimating prompt tokens from text length")
+            return
+        try:
+            try:
+                self.encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # The encoding files are downloaded on first use
+            print(f"⚠️  Could not load tokenizer for {model} ({str(e)}), estimating prompt tokens from text length")
+
+    def count_tokens(self, text: str) -> int:
+        if self.encoding:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        # Roughly four characters per token for English text
+        return (len(text) + 3) // 4
+
+    def compress(self, text: str, ranked_sentences: Sequence[Tuple[str, float]]) -> CompressedPrompt:
+        """
+        Return the most salient sentences of text that fit within the token budget.
+        Text already within budget is returned unchanged.
+        """
+        started = time.perf_counter()
+        original_tokens = self.count_tokens(text)
+        if original_tokens <= self.token_budget or not ranked_sentences:
+            return CompressedPrompt(text, original_tokens, original_tokens, (time.perf_counter() - started) * 1000)
+
+        separator_tokens = self.count_tokens(GAP)
+        lengths = [self.count_tokens(sentence) for sentence, _ in ranked_sentences]
+        by_salience = sorted(range(len(ranked_sentences)), key=lambda i: ranked_sentences[i][1], reverse=True)
+
+        selected: List[int] = []
+        used = 0
+        for i in by_salience:
+            if ranked_sentences[i][1] <= 0:
+                # Nothing salient left; a shorter prompt beats padding it with boilerplate
+                break
+            cost = lengths[i] + separator_tokens
+            if used + cost <= self.token_budget:
+                selected.append(i)
+                used += cost
+
+        if selected:
+            compressed = self._join(ranked_sentences, sorted(selected))
+        else:
+            # Not even one sentence fits; keep the start of the most salient one
+            compressed = self._truncate(ranked_sentences[by_salience[0]][0])
+
+        return CompressedPrompt(compressed, original_tokens, self.count_tokens(compressed), (time.perf_counter() - started) * 1000)
+
+    def _join(self, ranked_sentences: Sequence[Tuple[str, float]], indices: List[int]) -> str:
+        parts = [ranked_sentences[indices[0]][0]]
+        for previous, i in zip(indices, indices[1:]):
+            parts.append(" " if i == previous + 1 else GAP)
+            parts.append(ranked_sentences[i][0])
+        return "".join(parts)
+
+    def _truncate(self, text: str) -> str:
+        if self.encoding:
+            return self.encoding.decode(self.encoding.encode(text, disallowed_special=())[:self.token_budget])
+        return text[:self.token_budget * 4]
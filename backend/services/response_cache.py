@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional
+import orjson
+from config import config
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+    version: int
+    stored_at: float
+
+class ResponseCache:
+    """
+    Read-through cache of serialized list/search responses.
+
+    Entries are tagged with the data version they were built from; once the
+    version moves on (DatabaseService bumps it on every save) they are treated
+    as misses. A TTL bounds staleness for writes made by other processes.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        cache_config = config.get_response_cache_config()
+        self.max_entries = max_entries or cache_config["max_entries"]
+        self.ttl = ttl if ttl is not None else cache_config["ttl"]
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+
+    async def get_or_load(self, key: Hashable, version: int, loader: Callable[[], Awaitable[Any]]) -> CachedResponse:
+        """
+        Return the cached response for key, loading and serializing it on a miss.
+        Concurrent misses for the same key share a single load.
+        """
+        entry = self._get(key, version)
+        if entry:
+            return entry
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            entry = self._get(key, version)
+            if entry:
+                return entry
+
+            payload = await loader()
+            body = orjson.dumps(payload)
+            entry = CachedResponse(
+                body=body,
+                # Weak: the compression middleware sends several encodings of one body
+                etag=f'W/"{hashlib.sha1(body).hexdigest()}"',
+                version=version,
+                stored_at=time.monotonic()
+            )
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._locks.pop(evicted, None)
+            return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def _get(self, key: Hashable, version: int) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        if entry.version != version or time.monotonic() - entry.stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison, per RFC 9110)
+    """
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(_opaque_tag(tag) == _opaque_tag(etag) for tag in candidates)
+
+def _opaque_tag(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
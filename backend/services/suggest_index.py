@@ -0,0 +1,195 @@
+import bisect
+import heapq
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+KINDS = ("topic", "keyword", "entity")
+
+# Prefixes up to this length have their completions precomputed
+SHORT_PREFIX = 2
+MAX_LIMIT = 50
+
+class SuggestIndex:
+    """
+    In-memory autocomplete over distinct topics, keywords and entity names.
+
+    Terms are kept in a sorted array of lowercased keys, so the completions of
+    a prefix are one contiguous run found by binary search. Each term carries
+    a count per kind (how many analyses mention it), and completions are ranked
+    by count. Short prefixes match too many terms to rank on every keystroke,
+    so their top MAX_LIMIT completions are kept precomputed. Counts only ever
+    grow, so those lists can be maintained exactly on each update.
+
+    Unfiltered counts are per analysis, not per kind: a term that is both a
+    topic and a keyword of one analysis counts once.
+
+    build() may run in a thread while add_analysis() keeps being called from
+    the event loop. Analyses added meanwhile are replayed onto the new arrays
+    unless the build already read them.
+    """
+
+    def __init__(self):
+        self.built = False
+        self.built_at = 0.0
+        self._keys: List[str] = []
+        self._terms: Dict[str, Dict[str, Any]] = {}
+        # (prefix, kind or None) -> [(-count, key)] sorted, at most MAX_LIMIT long
+        self._top: Dict[Tuple[str, Optional[str]], List[Tuple[int, str]]] = {}
+        self._lock = threading.Lock()
+        # (analysis id, analysis) added while a build is running, else None
+        self._added_during_build: Optional[List[Tuple[Optional[str], Dict[str, Any]]]] = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add_analysis(self, analysis: Dict[str, Any], analysis_id: Optional[str] = None):
+        """Count the topics, keywords and entities of one saved analysis"""
+        with self._lock:
+            if self._added_during_build is not None:
+                self._added_during_build.append((analysis_id, analysis))
+            self._add_analysis(analysis)
+
+    def build(self, analyses: Iterable[Dict[str, Any]]):
+        """Rebuild from scratch; the new arrays replace the old ones in one step"""
+        with self._lock:
+            self._added_during_build = []
+        try:
+            fresh = SuggestIndex()
+            seen_ids = set()
+            for analysis in analyses:
+                seen_ids.add(analysis.get("id"))
+                for _ in fresh._add_terms(analysis, keep_sorted=False):
+                    pass
+            fresh._keys.sort()
+            fresh._build_top()
+        except BaseException:
+            with self._lock:
+                self._added_during_build = None
+            raise
+
+        with self._lock:
+            added, self._added_during_build = self._added_during_build, None
+            self._keys, self._terms, self._top = fresh._keys, fresh._terms, fresh._top
+            for analysis_id, analysis in added:
+                if analysis_id is None or analysis_id not in seen_ids:
+                    self._add_analysis(analysis)
+            self.built = True
+            self.built_at = time.time()
+
+    def suggest(self, prefix: str, limit: int = 10, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return up to limit terms starting with prefix, most frequent first"""
+        prefix = prefix.strip().lower()
+        limit = min(limit, MAX_LIMIT)
+        if not prefix:
+            return []
+
+        with self._lock:
+            return self._suggest(prefix, limit, kind)
+
+    def _suggest(self, prefix: str, limit: int, kind: Optional[str]) -> List[Dict[str, Any]]:
+        if len(prefix) <= SHORT_PREFIX:
+            top = self._top.get((prefix, kind), [])[:limit]
+        else:
+            start = bisect.bisect_left(self._keys, prefix)
+            # Every key with this prefix sorts before prefix + the highest code point
+            end = bisect.bisect_left(self._keys, prefix + "\U0010ffff", start)
+            candidates = [(-self._count(key, kind), key) for key in self._keys[start:end]]
+            top = heapq.nsmallest(limit, (candidate for candidate in candidates if candidate[0]))
+
+        return [
+            {"text": self._terms[key]["text"], "count": -negative_count, "kinds": list(self._terms[key]["counts"])}
+            for negative_count, key in top
+        ]
+
+    def _add_analysis(self, analysis: Dict[str, Any]):
+        for kind, key in self._add_terms(analysis):
+            for n in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                self._offer(key[:n], None, key)
+                self._offer(key[:n], kind, key)
+
+    def _add_terms(self, analysis: Dict[str, Any], keep_sorted: bool = True) -> Iterable[Tuple[str, str]]:
+        """Bump counts for an analysis's terms, yielding (kind, key) for each"""
+        counted = set()
+        for kind, terms in self._terms_of(analysis):
+            seen = set()
+            for term in terms:
+                term = term.strip()
+                key = term.lower()
+                # Count each term once per kind per analysis
+                if not key or key in seen:
+                    continue
+                seen.add(key)
+                entry = self._terms.get(key)
+                if entry is None:
+                    entry = self._terms[key] = {"text": term, "counts": {}, "total": 0}
+                    if keep_sorted:
+                        bisect.insort(self._keys, key)
+                    else:
+                        self._keys.append(key)
+                entry["counts"][kind] = entry["counts"].get(kind, 0) + 1
+                # ...and once overall, however many kinds it appears as
+                if key not in counted:
+                    counted.add(key)
+                    entry["total"] += 1
+                yield kind, key
+
+    def _count(self, key: str, kind: Optional[str]) -> int:
+        entry = self._terms[key]
+        return entry["counts"].get(kind, 0) if kind else entry["total"]
+
+    def _offer(self, prefix: str, kind: Optional[str], key: str):
+        """Re-rank key in a prefix's top list after its count went up"""
+        top = self._top.setdefault((prefix, kind), [])
+        for i, (_, existing) in enumerate(top):
+            if existing == key:
+                del top[i]
+                break
+        bisect.insort(top, (-self._count(key, kind), key))
+        del top[MAX_LIMIT:]
+
+    def _build_top(self):
+        heaps: Dict[Tuple[str, Optional[str]], List[Tuple[int, str]]] = defaultdict(list)
+        for key, entry in self._terms.items():
+            for kind in (None, *entry["counts"]):
+                # Min-heap on (count, inverted key order) keeps the MAX_LIMIT best
+                item = (self._count(key, kind), _Descending(key))
+                for n in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                    heap = heaps[(key[:n], kind)]
+                    if len(heap) < MAX_LIMIT:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+        self._top = {
+            prefix: sorted((-count, wrapped.key) for count, wrapped in heap)
+            for prefix, heap in heaps.items()
+        }
+
+    @staticmethod
+    def _terms_of(analysis: Dict[str, Any]) -> Iterable[Tuple[str, List[str]]]:
+        yield "topic", [term for term in analysis.get("topics") or [] if isinstance(term, str)]
+        yield "keyword", [term for term in analysis.get("keywords") or [] if isinstance(term, str)]
+        entities = []
+        for category, names in (analysis.get("entities") or {}).items():
+            for name in names or []:
+                if not isinstance(name, str):
+                    continue
+                # Uncategorized entities are stored as "Name (LABEL)"
+                if category == "entities" and name.endswith(")") and " (" in name:
+                    name = name[:name.rindex(" (")]
+                entities.append(name)
+        yield "entity", entities
+
+class _Descending:
+    """Orders strings in reverse, so ties on count keep the alphabetically first key"""
+    __slots__ = ("key",)
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return self.key > other.key
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, _Descending) and self.key == other.key
@@ -1,12 +1,17 @@
+import math
 import re
 from collections import Counter
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
 import nltk
 import spacy
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+from nltk.tokenize import word_tokenize, sent_tokenize
 from nltk.tag import pos_tag
 
+# Bump whenever keyword/entity/phrase/readability logic changes, so stored
+# insights computed by older logic can be found and recomputed (see reanalyze.py)
+TEXT_PROCESSOR_VERSION = "1"
+
 class TextProcessor:
     def __init__(self):
         # Download required NLTK data
@@ -28,24 +33,33 @@ class TextProcessor:
             print("spaCy model 'en_core_web_sm' not found. Please install it with: python -m spacy download en_core_web_sm")
             self.nlp = None
     
-    def extract_keywords(self, text: str, num_keywords: int = 3) -> List[str]:
+    @property
+    def analyzer_version(self) -> str:
+        """
+        Identifies the logic and model that produced a set of insights
+        """
+        if not self.nlp:
+            return f"tp{TEXT_PROCESSOR_VERSION}/nltk"
+        return f"tp{TEXT_PROCESSOR_VERSION}/{self.nlp.meta['lang']}_{self.nlp.meta['name']}-{self.nlp.meta['version']}"
+    
+    def extract_keywords(self, text: str, num_keywords: int = 3, doc=None) -> List[str]:
         """
         Extract the most frequent nouns from the text using spaCy (with NLTK fallback)
         """
         try:
             if self.nlp:
-                return self._extract_keywords_spacy(text, num_keywords)
+                return self._extract_keywords_spacy(text, num_keywords, doc)
             else:
                 return self._extract_keywords_nltk(text, num_keywords)
         except Exception as e:
             print(f"Error extracting keywords: {str(e)}")
             return self._extract_keywords_nltk(text, num_keywords)
     
-    def _extract_keywords_spacy(self, text: str, num_keywords: int = 3) -> List[str]:
+    def _extract_keywords_spacy(self, text: str, num_keywords: int = 3, doc=None) -> List[str]:
         """
         Extract keywords using spaCy for better accuracy
         """
-        doc = self.nlp(text)
+        doc = doc if doc is not None else self.nlp(text)
         
         # Extract nouns and proper nouns
         nouns = []
@@ -82,7 +96,7 @@ class TextProcessor:
         word_freq = Counter(nouns)
         return [word for word, count in word_freq.most_common(num_keywords)]
     
-    def extract_entities(self, text: str) -> Dict[str, List[str]]:
+    def extract_entities(self, text: str, doc=None) -> Dict[str, List[str]]:
         """
         Extract named entities using spaCy
         """
@@ -90,7 +104,7 @@ class TextProcessor:
             return {"entities": [], "organizations": [], "people": [], "locations": []}
         
         try:
-            doc = self.nlp(text)
+            doc = doc if doc is not None else self.nlp(text)
             entities = {
                 "entities": [],
                 "organizations": [],
@@ -118,7 +132,7 @@ class TextProcessor:
             print(f"Error extracting entities: {str(e)}")
             return {"entities": [], "organizations": [], "people": [], "locations": []}
     
-    def extract_phrases(self, text: str, num_phrases: int = 3) -> List[str]:
+    def extract_phrases(self, text: str, num_phrases: int = 3, doc=None) -> List[str]:
         """
         Extract key phrases using spaCy noun chunks
         """
@@ -126,7 +140,7 @@ class TextProcessor:
             return []
         
         try:
-            doc = self.nlp(text)
+            doc = doc if doc is not None else self.nlp(text)
             phrases = []
             
             for chunk in doc.noun_chunks:
@@ -144,20 +158,25 @@ class TextProcessor:
             print(f"Error extracting phrases: {str(e)}")
             return []
     
-    def get_advanced_insights(self, text: str) -> Dict[str, Any]:
+    def get_advanced_insights(self, text: str, doc=None) -> Dict[str, Any]:
         """
-        Get comprehensive text insights using spaCy
+        Get comprehensive text insights using spaCy. All insights are derived
+        from a single parse; pass doc if the text has already been parsed.
         """
         if not self.nlp:
-            return {"keywords": self.extract_keywords(text), "entities": {}, "phrases": []}
+            return self._get_basic_insights(text)
         
         try:
-            doc = self.nlp(text)
+            doc = doc if doc is not None else self.nlp(text)
+            keywords = self.extract_keywords(text, doc=doc)
+            phrases = self.extract_phrases(text, doc=doc)
             
             insights = {
-                "keywords": self.extract_keywords(text),
-                "entities": self.extract_entities(text),
-                "phrases": self.extract_phrases(text),
+                "keywords": keywords,
+                "entities": self.extract_entities(text, doc=doc),
+                "phrases": phrases,
+                "lemmas": self._get_lemmas(doc),
+                "sentences": self.rank_sentences(text, keywords, phrases, doc=doc),
                 "sentiment_score": self._get_sentiment_score(doc),
                 "readability_score": self._get_readability_score(text),
                 "word_count": len(doc),
@@ -168,7 +187,94 @@ class TextProcessor:
             
         except Exception as e:
             print(f"Error getting advanced insights: {str(e)}")
-            return {"keywords": self.extract_keywords(text), "entities": {}, "phrases": []}
+            return self._get_basic_insights(text)
+    
+    def _get_basic_insights(self, text: str) -> Dict[str, Any]:
+        """
+        Insights available without spaCy
+        """
+        keywords = self.extract_keywords(text)
+        return {
+            "keywords": keywords,
+            "entities": {},
+            "phrases": [],
+            "lemmas": self._get_lemmas_nltk(text),
+            "sentences": self.rank_sentences(text, keywords, [])
+        }
+    
+    def rank_sentences(self, text: str, keywords: Iterable[str] = (), phrases: Iterable[str] = (), doc=None) -> List[Tuple[str, float]]:
+        """
+        Score each sentence by salience and return (sentence, score) in document order.
+        A sentence scores higher the more of the document's frequent content lemmas,
+        keywords and key phrases it contains, normalized for its length.
+        Uses spaCy sentence boundaries when a parsed doc is given, NLTK otherwise.
+        """
+        if doc is not None:
+            sentences = [(sent.text.strip(), self._get_lemmas(sent)) for sent in doc.sents]
+        else:
+            sentences = [(sent.strip(), self._get_lemmas_nltk(sent)) for sent in sent_tokenize(text)]
+        sentences = [(sentence, lemmas) for sentence, lemmas in sentences if sentence]
+        
+        frequencies = Counter(lemma for _, lemmas in sentences for lemma in lemmas)
+        top_frequency = max(frequencies.values(), default=1)
+        keywords = {keyword.lower() for keyword in keywords}
+        phrases = [phrase.lower() for phrase in phrases]
+        
+        ranked = []
+        for position, (sentence, lemmas) in enumerate(sentences):
+            distinct = set(lemmas)
+            # Luhn-style density of frequent terms; short boilerplate lines score near zero
+            score = sum(frequencies[lemma] / top_frequency for lemma in distinct) / math.sqrt(len(lemmas) + 1)
+            score += len(keywords & distinct)
+            lowered = sentence.lower()
+            score += 1.5 * sum(1 for phrase in phrases if phrase in lowered)
+            if position == 0:
+                # The lead sentence usually states the subject
+                score += 0.5
+            ranked.append((sentence, round(score, 4)))
+        return ranked
+    
+    def get_advanced_insights_batch(self, items: Iterable[Tuple[str, Any]], n_process: int = 1, batch_size: int = 64) -> Iterator[Tuple[Dict[str, Any], Any]]:
+        """
+        Stream insights for (text, context) pairs, parsing with nlp.pipe across
+        n_process processes. Yields (insights, context) in input order.
+        """
+        if not self.nlp:
+            for text, context in items:
+                yield self.get_advanced_insights(text), context
+            return
+        
+        for doc, context in self.nlp.pipe(items, as_tuples=True, n_process=n_process, batch_size=batch_size):
+            yield self.get_advanced_insights(doc.text, doc), context
+    
+    def extract_lemmas_batch(self, texts: Iterable[str], batch_size: int = 64) -> Iterator[List[str]]:
+        """
+        Stream content lemmas for many texts using spaCy's nlp.pipe
+        """
+        if not self.nlp:
+            for text in texts:
+                yield self._get_lemmas_nltk(text)
+            return
+        
+        # Lemmas only need the tagger and lemmatizer
+        for doc in self.nlp.pipe(texts, batch_size=batch_size, disable=["parser", "ner"]):
+            yield self._get_lemmas(doc)
+    
+    def _get_lemmas(self, doc) -> List[str]:
+        """
+        Lowercased lemmas of content words, in document order
+        """
+        return [
+            token.lemma_.lower() for token in doc
+            if token.is_alpha and not token.is_stop and len(token.text) > 2
+        ]
+    
+    def _get_lemmas_nltk(self, text: str) -> List[str]:
+        """
+        Fallback lemmas using NLTK tokens (no lemmatization available)
+        """
+        tokens = word_tokenize(re.sub(r'[^\w\s]', '', text.lower()))
+        return [word for word in tokens if word.isalpha() and word not in self.stop_words and len(word) > 2]
     
     def _get_sentiment_score(self, doc) -> float:
         """
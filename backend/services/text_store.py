@@ -0,0 +1,29 @@
+"""
+Helpers for content-addressed storage of raw analysis text.
+
+Texts are keyed by the SHA-256 of their UTF-8 bytes and stored zstd-compressed
+in the text_blobs table, so resubmitting the same document stores nothing new.
+"""
+import hashlib
+import zstandard as zstd
+
+COMPRESSION_LEVEL = 3
+
+def text_hash(text: str) -> str:
+    """Content address of a text: hex SHA-256 of its UTF-8 encoding"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def compress_text(text: str) -> bytes:
+    # Compressor objects are not thread-safe and are cheap to create
+    return zstd.ZstdCompressor(level=COMPRESSION_LEVEL).compress(text.encode("utf-8"))
+
+def decompress_text(data: bytes) -> str:
+    return zstd.ZstdDecompressor().decompress(data).decode("utf-8")
+
+def to_bytea(data: bytes) -> str:
+    """Encode bytes for a Postgres BYTEA column sent through PostgREST"""
+    return "\\x" + data.hex()
+
+def from_bytea(value: str) -> bytes:
+    """Decode a BYTEA value as returned by PostgREST (hex format)"""
+    return bytes.fromhex(value[2:] if value.startswith("\\x") else value)
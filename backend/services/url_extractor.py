@@ -7,6 +7,10 @@ import time
 
 class URLExtractor:
     def __init__(self):
+        self.reset_session()
+    
+    def reset_session(self):
+        """Create a fresh HTTP session (e.g. in a newly forked worker)"""
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
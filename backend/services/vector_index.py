@@ -0,0 +1,432 @@
+import json
+import math
+import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Iterable, Tuple
+import numpy as np
+from scipy import sparse
+from config import config
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+class VectorIndex:
+    """
+    Compact sparse TF-IDF index over analyses for "related analyses" lookups.
+
+    Each document is stored as a row of sublinear term frequencies (1 + log tf)
+    in a CSR matrix, so documents can be added incrementally without re-weighting
+    the rows that are already indexed. New rows are kept in a small pending block
+    and folded into the main matrix every flush_every adds. IDF weights are frozen
+    together with the main matrix's document norms at that point, so every score
+    uses one IDF vector and similarity stays symmetric. Terms first seen after
+    the freeze are weighted by their current document frequency.
+
+    Each flush persists the row (CSR) and column (CSC) arrays, the document
+    norms and the frozen IDF, and every process memory-maps them, so the pages
+    are shared and reloading after another process's flush costs no recompute.
+
+    Several worker processes can share one index directory: writes go through an
+    append-only journal under an exclusive file lock, reads take a shared lock,
+    and each process tails the journal (or reloads after another process
+    flushes) before it reads or writes. Reads can reload the whole index, so
+    call them from a thread rather than the event loop.
+    """
+
+    def __init__(self, index_dir: Optional[str] = None, flush_every: Optional[int] = None):
+        index_config = config.get_vector_index_config()
+        self.index_dir = index_dir or index_config["index_dir"]
+        self.flush_every = flush_every or index_config["flush_every"]
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+
+        self._reset()
+        with self._locked(fcntl.LOCK_EX if fcntl else None):
+            self._load()
+
+    def _reset(self):
+        self._vocabulary: Optional[Dict[str, int]] = {}
+        self.terms: List[str] = []
+        self.doc_ids: List[str] = []
+        self.id_to_row: Dict[str, int] = {}
+        self.doc_freq = np.zeros(0, dtype=np.int32)
+
+        self._matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._columns: Optional[sparse.csc_matrix] = None
+        self._doc_norms: Optional[np.ndarray] = None
+        self._frozen_idf = np.zeros(0, dtype=np.float32)
+        self._pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._unflushed = 0
+        self._journal_offset = 0
+        self._loaded_stamp: Optional[Tuple[int, int]] = None
+
+    @property
+    def vocabulary(self) -> Dict[str, int]:
+        # Only writers need the term -> column map; skip building it on reads
+        if self._vocabulary is None:
+            self._vocabulary = {term: i for i, term in enumerate(self.terms)}
+        return self._vocabulary
+
+    def __len__(self) -> int:
+        with self._shared():
+            self._sync()
+            return len(self.doc_ids)
+
+    @staticmethod
+    def build_terms(lemmas: Iterable[str], keywords: Optional[Iterable[str]] = None, phrases: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Combine lemmas, keywords and phrases into the term list for one document.
+        Keywords are repeated on top of the lemmas so they carry extra weight;
+        phrases are kept whole so multi-word concepts match as a unit.
+        """
+        terms = [lemma.lower() for lemma in lemmas if lemma]
+        terms.extend(keyword.lower() for keyword in (keywords or []) if keyword)
+        terms.extend(phrase.strip().lower() for phrase in (phrases or []) if phrase and phrase.strip())
+        return terms
+
+    def add(self, doc_id: str, terms: Iterable[str]) -> bool:
+        """
+        Add a document to the index. Returns False if it was already indexed
+        or has no usable terms.
+        """
+        counts = Counter(term for term in terms if term)
+        with self._exclusive():
+            self._sync()
+            if doc_id in self.id_to_row or not counts:
+                return False
+
+            self._append(doc_id, counts)
+            self._journal(doc_id, counts)
+
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self.flush()
+            return True
+
+    def related(self, doc_id: str, k: int = 5) -> Optional[List[Tuple[str, float]]]:
+        """
+        Return up to k (doc_id, cosine similarity) pairs most similar to doc_id,
+        or None if doc_id is not indexed
+        """
+        with self._shared():
+            self._sync()
+            row = self.id_to_row.get(doc_id)
+            if row is None:
+                return None
+
+            pending = self._pending_matrix()
+            main_rows = self._matrix.shape[0]
+            query = self._matrix.getrow(row) if row < main_rows else pending.getrow(row - main_rows)
+            cols = query.indices
+            if len(cols) == 0:
+                return []
+
+            idf = self._query_idf()
+            idf_sq = idf[cols] ** 2
+            query_weights = query.data * idf_sq
+            query_norm = math.sqrt(float(np.dot(query.data ** 2, idf_sq)))
+
+            # Only the columns the query touches contribute to the dot products.
+            # Rows added since the last consolidation are scored as a small side block.
+            in_main = cols < self._columns.shape[1]
+            main_scores = self._columns[:, cols[in_main]] @ query_weights[in_main]
+            pending_scores = pending[:, cols] @ query_weights
+            pending_norms = np.sqrt(pending.power(2) @ (idf ** 2))
+
+            scores = np.concatenate([main_scores, pending_scores]).astype(np.float32)
+            denominator = np.concatenate([self._doc_norms, pending_norms]) * query_norm
+            np.divide(scores, denominator, out=scores, where=denominator > 0)
+            scores[row] = 0.0
+
+            k = min(k, len(scores) - 1)
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.doc_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def flush(self):
+        """
+        Consolidate pending rows, persist the matrix and metadata, then truncate the journal
+        """
+        with self._exclusive():
+            self._sync()
+            self._consolidate()
+            self._unflushed = 0
+            if not self.index_dir:
+                return
+
+            # Write-then-rename so other processes' memory maps keep the old files intact
+            self._save_array("data.npy", self._matrix.data)
+            self._save_array("indices.npy", self._matrix.indices)
+            self._save_array("indptr.npy", self._matrix.indptr)
+            self._save_array("columns_data.npy", self._columns.data)
+            self._save_array("columns_indices.npy", self._columns.indices)
+            self._save_array("columns_indptr.npy", self._columns.indptr)
+            self._save_array("doc_norms.npy", self._doc_norms)
+            self._save_array("idf.npy", self._frozen_idf)
+            self._save_array("doc_freq.npy", self.doc_freq[:len(self.terms)])
+
+            meta_path = self._path("meta.json")
+            with open(meta_path + ".tmp", "w") as f:
+                json.dump({"doc_ids": self.doc_ids, "terms": self.terms}, f)
+            os.replace(meta_path + ".tmp", meta_path)
+
+            open(self._path("journal.jsonl"), "w").close()
+            self._journal_offset = 0
+            self._loaded_stamp = self._meta_stamp()
+            # Drop this process's private copies in favour of the shared files
+            self._map_arrays()
+            print(f"💾 Vector index flushed: {len(self.doc_ids)} documents, {len(self.terms)} terms")
+
+    def _exclusive(self):
+        """Lock for writes: excludes every other process using the index directory"""
+        return self._locked(fcntl.LOCK_EX if fcntl else None)
+
+    def _shared(self):
+        """Lock for reads: other processes may read concurrently, but not write"""
+        return self._locked(fcntl.LOCK_SH if fcntl else None)
+
+    @contextmanager
+    def _locked(self, mode: Optional[int]):
+        """
+        Hold the in-process lock and, for a persisted index, a file lock on the
+        index directory shared with other worker processes. Nested calls reuse
+        the outer file lock.
+        """
+        with self._lock:
+            lock_file = None
+            if self.index_dir and mode is not None and self._lock_depth == 0:
+                os.makedirs(self.index_dir, exist_ok=True)
+                lock_file = open(self._path("index.lock"), "a")
+                fcntl.flock(lock_file, mode)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if lock_file:
+                    # Closing the file releases the flock
+                    lock_file.close()
+
+    def _sync(self):
+        """
+        Pick up changes made by other processes: reload after a flush, otherwise
+        replay journal entries appended since we last looked
+        """
+        if not self.index_dir:
+            return
+        journal_path = self._path("journal.jsonl")
+        journal_size = os.path.getsize(journal_path) if os.path.exists(journal_path) else 0
+        if self._meta_stamp() != self._loaded_stamp or journal_size < self._journal_offset:
+            self._reset()
+            self._load()
+        elif journal_size > self._journal_offset:
+            self._replay_journal()
+
+    def _meta_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self._path("meta.json"))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _save_array(self, name: str, array: np.ndarray):
+        tmp_path = self._path(name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, self._path(name))
+
+    def _append(self, doc_id: str, counts: Counter):
+        cols = np.empty(len(counts), dtype=np.int32)
+        weights = np.empty(len(counts), dtype=np.float32)
+        for i, (term, count) in enumerate(counts.items()):
+            col = self.vocabulary.get(term)
+            if col is None:
+                col = len(self.terms)
+                self.vocabulary[term] = col
+                self.terms.append(term)
+            cols[i] = col
+            weights[i] = 1.0 + math.log(count)
+
+        if len(self.terms) > len(self.doc_freq):
+            grown = np.zeros(max(len(self.terms), 2 * len(self.doc_freq)), dtype=np.int32)
+            grown[:len(self.doc_freq)] = self.doc_freq
+            self.doc_freq = grown
+        self.doc_freq[cols] += 1
+
+        order = np.argsort(cols)
+        self._pending.append((cols[order], weights[order]))
+        self.id_to_row[doc_id] = len(self.doc_ids)
+        self.doc_ids.append(doc_id)
+
+    def _consolidate(self):
+        """
+        Fold pending rows into the CSR matrix and its column view, then freeze
+        the IDF and refresh the norms
+        """
+        n_terms = len(self.terms)
+        if not self._pending and self._columns is not None and self._matrix.shape[1] == n_terms:
+            return
+
+        existing = sparse.csr_matrix(
+            (self._matrix.data, self._matrix.indices, self._matrix.indptr),
+            shape=(self._matrix.shape[0], n_terms)
+        )
+        columns = self._columns if self._columns is not None else existing.tocsc()
+        if self._pending:
+            pending = self._pending_matrix()
+            self._pending = []
+            columns = self._append_columns(columns, pending)
+            existing = sparse.vstack([existing, pending], format="csr", dtype=np.float32)
+
+        self._matrix = existing
+        self._columns = columns
+        self._frozen_idf = self._idf()
+        self._doc_norms = np.sqrt(existing.power(2) @ (self._frozen_idf ** 2)).astype(np.float32)
+
+    @staticmethod
+    def _append_columns(columns: sparse.csc_matrix, rows: sparse.csr_matrix) -> sparse.csc_matrix:
+        """
+        Append rows to a column-major matrix. The new rows come after every
+        existing one, so each column's new entries go at the end of that column
+        and nothing already stored needs re-sorting (unlike a full tocsc()).
+        """
+        n_rows, n_terms = columns.shape[0], rows.shape[1]
+        old_indptr = np.full(n_terms + 1, columns.indptr[-1], dtype=np.int64)
+        old_indptr[:len(columns.indptr)] = columns.indptr
+        new = rows.tocsc()
+        new.sort_indices()
+
+        # Every entry of column c lands before position old_indptr[c + 1]
+        at = np.repeat(old_indptr[1:], np.diff(new.indptr))
+        data = np.insert(columns.data, at, new.data)
+        indices = np.insert(columns.indices, at, new.indices + n_rows).astype(np.int32)
+        indptr = old_indptr + new.indptr
+        return sparse.csc_matrix((data, indices, indptr), shape=(n_rows + rows.shape[0], n_terms))
+
+    def _pending_matrix(self) -> sparse.csr_matrix:
+        """
+        Rows added since the last consolidation, as a CSR block over the current vocabulary
+        """
+        n_terms = len(self.terms)
+        if not self._pending:
+            return sparse.csr_matrix((0, n_terms), dtype=np.float32)
+        indptr = np.zeros(len(self._pending) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(cols) for cols, _ in self._pending])
+        return sparse.csr_matrix(
+            (np.concatenate([w for _, w in self._pending]),
+             np.concatenate([c for c, _ in self._pending]),
+             indptr),
+            shape=(len(self._pending), n_terms)
+        )
+
+    def _idf(self) -> np.ndarray:
+        n_docs = len(self.doc_ids)
+        doc_freq = self.doc_freq[:len(self.terms)]
+        return (np.log((1.0 + n_docs) / (1.0 + doc_freq)) + 1.0).astype(np.float32)
+
+    def _query_idf(self) -> np.ndarray:
+        """
+        The IDF frozen at the last consolidation, extended with current weights
+        for terms added since (only pending rows use those columns)
+        """
+        frozen = len(self._frozen_idf)
+        if frozen == len(self.terms):
+            return self._frozen_idf
+        return np.concatenate([self._frozen_idf, self._idf()[frozen:]])
+
+    def _journal(self, doc_id: str, counts: Counter):
+        if not self.index_dir:
+            return
+        line = (json.dumps({"id": doc_id, "counts": counts}) + "\n").encode("utf-8")
+        with open(self._path("journal.jsonl"), "ab") as f:
+            f.write(line)
+        # We hold the directory lock and were synced, so nobody appended in between
+        self._journal_offset += len(line)
+
+    def _load(self):
+        """
+        Load the persisted matrix (memory-mapped) and replay any journaled adds
+        """
+        stamp = self._meta_stamp() if self.index_dir else None
+        self._loaded_stamp = stamp
+        if stamp is None:
+            self._consolidate()
+            self._replay_journal()
+            return
+
+        try:
+            with open(self._path("meta.json")) as f:
+                meta = json.load(f)
+            self.terms = meta["terms"]
+            self._vocabulary = None
+            self.doc_ids = meta["doc_ids"]
+            self.id_to_row = {doc_id: i for i, doc_id in enumerate(self.doc_ids)}
+            self.doc_freq = np.array(np.load(self._path("doc_freq.npy")), dtype=np.int32)
+            self._map_arrays()
+            print(f"✅ Vector index loaded: {len(self.doc_ids)} documents, {len(self.terms)} terms")
+        except Exception as e:
+            print(f"⚠️  Failed to load vector index, starting empty: {e}")
+            self._reset()
+            self._loaded_stamp = stamp
+
+        # Indexes flushed before the column view was persisted get it computed
+        # here; journaled adds stay pending
+        self._consolidate()
+        self._replay_journal()
+
+    def _map_arrays(self):
+        """
+        Memory-map the flushed matrix, its column view, the norms and the IDF
+        frozen with them. Older index directories lack all but the matrix.
+        """
+        shape = (len(self.doc_ids), len(self.terms))
+        self._matrix = sparse.csr_matrix(
+            (np.load(self._path("data.npy"), mmap_mode="r"),
+             np.load(self._path("indices.npy"), mmap_mode="r"),
+             np.load(self._path("indptr.npy"), mmap_mode="r")),
+            shape=shape
+        )
+        if not os.path.exists(self._path("idf.npy")):
+            self._columns = None
+            return
+        self._columns = sparse.csc_matrix(
+            (np.load(self._path("columns_data.npy"), mmap_mode="r"),
+             np.load(self._path("columns_indices.npy"), mmap_mode="r"),
+             np.load(self._path("columns_indptr.npy"), mmap_mode="r")),
+            shape=shape
+        )
+        self._doc_norms = np.load(self._path("doc_norms.npy"), mmap_mode="r")
+        self._frozen_idf = np.load(self._path("idf.npy"), mmap_mode="r")
+
+    def _replay_journal(self):
+        if not self.index_dir or not os.path.exists(self._path("journal.jsonl")):
+            return
+
+        with open(self._path("journal.jsonl"), "rb") as f:
+            f.seek(self._journal_offset)
+            chunk = f.read()
+        # Leave a torn final line (crash mid-write) for a later pass
+        complete = chunk.rfind(b"\n") + 1
+
+        replayed = 0
+        for line in chunk[:complete].splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if entry["id"] not in self.id_to_row:
+                self._append(entry["id"], Counter(entry["counts"]))
+                replayed += 1
+        self._journal_offset += complete
+        self._unflushed += replayed
+        if replayed:
+            print(f"🔁 Replayed {replayed} journaled vector index entries")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.index_dir, name)
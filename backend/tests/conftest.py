@@ -0,0 +1,8 @@
+import os
+import sys
+
+# config.py requires these at import time; the tests never talk to Supabase
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,43 @@
+import asyncio
+import json
+from services.ingestion import IngestionPipeline, iter_records
+from services.suggest_index import SuggestIndex
+from services.vector_index import VectorIndex
+
+class FakeTextProcessor:
+    analyzer_version = "test"
+
+    def get_advanced_insights_batch(self, items):
+        for text, context in items:
+            words = text.lower().split()
+            yield {"keywords": words[:2], "lemmas": words, "sentences": []}, context
+
+class FakeLLMService:
+    async def analyze_text(self, text, sentences=None):
+        return {"summary": text, "topics": [text.split()[0]], "sentiment": "neutral"}
+
+class FakeDatabaseService:
+    def __init__(self):
+        self.rows = []
+
+    def save_analyses(self, analyses):
+        start = len(self.rows)
+        self.rows.extend(analyses)
+        return [f"id-{i}" for i in range(start, len(self.rows))]
+
+def test_ingest_indexes_records_into_empty_indexes(tmp_path):
+    vector_index = VectorIndex(str(tmp_path / "vector_index"))
+    suggest_index = SuggestIndex()
+    assert len(vector_index) == 0 and len(suggest_index) == 0
+
+    lines = [json.dumps({"text": f"topic{i % 3} shared words number {i}"}) + "\n" for i in range(20)]
+    pipeline = IngestionPipeline(FakeTextProcessor(), FakeLLMService(), FakeDatabaseService(), vector_index, suggest_index)
+    summary = asyncio.run(pipeline.run(iter_records(lines, "jsonl")))
+
+    assert summary["succeeded"] == 20
+    assert len(vector_index) == 20
+    assert [match_id for match_id, _ in vector_index.related("id-0", 3)]
+    assert [suggestion["text"] for suggestion in suggest_index.suggest("to")] == ["topic0", "topic1", "topic2"]
+
+    # The final flush persists everything for the next process
+    assert len(VectorIndex(str(tmp_path / "vector_index"))) == 20
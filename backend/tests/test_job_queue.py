@@ -0,0 +1,42 @@
+import asyncio
+from services.job_queue import JobQueue
+
+def make_queue(tmp_path, handler, shutdown_timeout):
+    queue = JobQueue(handler, str(tmp_path / "jobs.sqlite3"))
+    queue.num_workers = 1
+    queue.shutdown_timeout = shutdown_timeout
+    return queue
+
+def test_stop_lets_running_job_finish(tmp_path):
+    async def handler(job):
+        await asyncio.sleep(0.2)
+        return {"done": True}
+
+    async def run():
+        queue = make_queue(tmp_path, handler, shutdown_timeout=5)
+        queue.start()
+        job_id = queue.submit("analyze", {})
+        await asyncio.sleep(0.05)
+        await queue.stop()
+        return queue.get(job_id)
+
+    job = asyncio.run(run())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"done": True}
+
+def test_stop_requeues_unfinished_job_without_using_an_attempt(tmp_path):
+    async def handler(job):
+        await asyncio.sleep(60)
+
+    async def run():
+        queue = make_queue(tmp_path, handler, shutdown_timeout=0.1)
+        queue.start()
+        job_id = queue.submit("analyze", {})
+        await asyncio.sleep(0.05)
+        assert queue.get(job_id)["status"] == "running"
+        await queue.stop()
+        return queue.get(job_id)
+
+    job = asyncio.run(run())
+    assert job["status"] == "queued"
+    assert job["attempts"] == 0
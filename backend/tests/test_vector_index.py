@@ -0,0 +1,33 @@
+import numpy as np
+from scipy import sparse
+from services.vector_index import VectorIndex
+
+def test_append_columns_matches_full_conversion():
+    existing = sparse.random(40, 30, density=0.2, format="csr", dtype=np.float32, random_state=0)
+    rows = sparse.random(7, 45, density=0.3, format="csr", dtype=np.float32, random_state=1)
+
+    appended = VectorIndex._append_columns(existing.tocsc(), rows)
+
+    widened = sparse.csr_matrix((existing.data, existing.indices, existing.indptr), shape=(40, 45))
+    expected = sparse.vstack([widened, rows]).tocsc()
+    expected.sort_indices()
+    assert np.array_equal(appended.indptr, expected.indptr)
+    assert np.array_equal(appended.indices, expected.indices)
+    assert np.array_equal(appended.data, expected.data)
+
+def test_other_processes_map_flushed_state_and_score_identically(tmp_path):
+    writer = VectorIndex(str(tmp_path), flush_every=10)
+    for i in range(25):
+        writer.add(f"doc-{i}", [f"term{(i * 7 + j) % 40}" for j in range(12)])
+
+    reader = VectorIndex(str(tmp_path), flush_every=10)
+    assert isinstance(reader._doc_norms, np.memmap)
+    assert isinstance(reader._frozen_idf, np.memmap)
+    assert reader.related("doc-3", 5) == writer.related("doc-3", 5)
+    # Rows still pending in the journal score the same way too
+    assert reader.related("doc-22", 5) == writer.related("doc-22", 5)
+
+    writer.add("doc-new", ["term1", "term2", "unseen"])
+    writer.flush()
+    assert reader.related("doc-new", 3) == writer.related("doc-new", 3)
+    assert dict(reader.related("doc-1", 25))["doc-2"] == dict(reader.related("doc-2", 25))["doc-1"]
@@ -1,9 +1,10 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Card, CardContent, CardHeader, CardTitle } from './ui/card';
 import { Button } from './ui/button';
 import { Input } from './ui/input';
 import { Badge } from './ui/badge';
-import type { SearchParams } from '../types';
+import { getSuggestions } from '../services/api';
+import type { SearchParams, Suggestion } from '../types';
 
 interface EnhancedSearchBarProps {
   onSearch: (params: SearchParams) => void;
@@ -20,6 +21,32 @@ const EnhancedSearchBar: React.FC<EnhancedSearchBarProps> = ({
   const [query, setQuery] = useState('');
   const [sentimentFilter, setSentimentFilter] = useState<string>('all');
   const [sortBy, setSortBy] = useState<'newest' | 'oldest' | 'sentiment'>('newest');
+  const [suggestions, setSuggestions] = useState<Suggestion[]>([]);
+
+  // Suggest matching topics/keywords as the user types
+  useEffect(() => {
+    const prefix = query.trim();
+    if (!prefix) {
+      setSuggestions([]);
+      return;
+    }
+
+    let cancelled = false;
+    const timer = setTimeout(() => {
+      getSuggestions(prefix, searchType)
+        .then((results) => {
+          if (!cancelled) setSuggestions(results);
+        })
+        .catch(() => {
+          if (!cancelled) setSuggestions([]);
+        });
+    }, 100);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query, searchType]);
 
   const handleSearch = (e: React.FormEvent) => {
     e.preventDefault();
@@ -93,7 +120,16 @@ const EnhancedSearchBar: React.FC<EnhancedSearchBarProps> = ({
               placeholder={`Search by ${searchType}...`}
               disabled={loading}
               className="flex-1"
+              list="search-suggestions"
+              autoComplete="off"
             />
+            <datalist id="search-suggestions">
+              {suggestions.map((suggestion) => (
+                <option key={suggestion.text} value={suggestion.text}>
+                  {`${suggestion.count} ${suggestion.count === 1 ? 'analysis' : 'analyses'}`}
+                </option>
+              ))}
+            </datalist>
 
             {/* Search Button */}
             <Button type="submit" disabled={loading || !query.trim()}>
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import type { TextAnalysis, TextAnalysisRequest, SearchParams, URLExtractionRequest, URLExtractionResponse } from '../types';
+import type { TextAnalysis, TextAnalysisRequest, AnalysisJob, SearchParams, Suggestion, SuggestionKind, URLExtractionRequest, URLExtractionResponse } from '../types';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
@@ -14,12 +14,23 @@ const api = axios.create({
     'Content-Type': 'application/json',
   },
   timeout: 30000, // 30 second timeout
+  // 304 Not Modified is answered from the local ETag cache below
+  validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
 });
 
+// Last ETag and body per GET URL, used for conditional requests
+const etagCache = new Map<string, { etag: string; data: unknown }>();
+
 // Add request interceptor for logging
 api.interceptors.request.use(
   (config) => {
     console.log(`🚀 API Request: ${config.method?.toUpperCase()} ${config.url}`);
+    if (config.method === 'get') {
+      const cached = etagCache.get(api.getUri(config));
+      if (cached) {
+        config.headers.set('If-None-Match', cached.etag);
+      }
+    }
     return config;
   },
   (error) => {
@@ -32,6 +43,14 @@ api.interceptors.request.use(
 api.interceptors.response.use(
   (response) => {
     console.log(`✅ API Response: ${response.status} ${response.config.url}`);
+    if (response.config.method === 'get') {
+      const key = api.getUri(response.config);
+      if (response.status === 304) {
+        response.data = etagCache.get(key)?.data;
+      } else if (response.headers.etag) {
+        etagCache.set(key, { etag: response.headers.etag, data: response.data });
+      }
+    }
     return response;
   },
   (error) => {
@@ -52,10 +71,36 @@ export const analyzeText = async (request: TextAnalysisRequest): Promise<TextAna
   }
 };
 
+// Serialize a sparse fieldset for the `fields=` projection parameter
+const fieldsParam = (fields?: (keyof TextAnalysis)[]) => (fields && fields.length > 0 ? fields.join(',') : undefined);
+
+export const submitAnalysisJob = async (request: TextAnalysisRequest): Promise<AnalysisJob> => {
+  try {
+    console.log('👷 Queueing analysis job...');
+    const response = await api.post('/jobs/analyze', request);
+    console.log(`✅ Job queued: ${response.data.id}`);
+    return response.data;
+  } catch (error) {
+    console.error('❌ Failed to queue analysis job:', error);
+    throw error;
+  }
+};
+
+export const getAnalysisJob = async (id: string): Promise<AnalysisJob> => {
+  try {
+    const response = await api.get(`/jobs/${id}`);
+    return response.data;
+  } catch (error) {
+    console.error('❌ Failed to fetch job status:', error);
+    throw error;
+  }
+};
+
 export const searchAnalyses = async (params: SearchParams): Promise<{ analyses: TextAnalysis[] }> => {
   try {
     console.log('🔍 Searching analyses...', params);
-    const response = await api.get('/search', { params });
+    const { fields, ...query } = params;
+    const response = await api.get('/search', { params: { ...query, fields: fieldsParam(fields) } });
     console.log(`✅ Found ${response.data.analyses.length} analyses`);
     return response.data;
   } catch (error) {
@@ -64,10 +109,10 @@ export const searchAnalyses = async (params: SearchParams): Promise<{ analyses:
   }
 };
 
-export const getAllAnalyses = async (): Promise<{ analyses: TextAnalysis[] }> => {
+export const getAllAnalyses = async (fields?: (keyof TextAnalysis)[]): Promise<{ analyses: TextAnalysis[] }> => {
   try {
     console.log('📊 Fetching all analyses...');
-    const response = await api.get('/analyses');
+    const response = await api.get('/analyses', { params: { fields: fieldsParam(fields) } });
     console.log(`✅ Retrieved ${response.data.analyses.length} analyses`);
     return response.data;
   } catch (error) {
@@ -76,6 +121,28 @@ export const getAllAnalyses = async (): Promise<{ analyses: TextAnalysis[] }> =>
   }
 };
 
+export const getRelatedAnalyses = async (id: string, k: number = 5): Promise<{ analyses: TextAnalysis[] }> => {
+  try {
+    console.log('🧮 Fetching related analyses...', id);
+    const response = await api.get(`/analyses/${id}/related`, { params: { k } });
+    console.log(`✅ Found ${response.data.analyses.length} related analyses`);
+    return response.data;
+  } catch (error) {
+    console.error('❌ Failed to fetch related analyses:', error);
+    throw error;
+  }
+};
+
+export const getSuggestions = async (prefix: string, kind?: SuggestionKind, limit: number = 8): Promise<Suggestion[]> => {
+  try {
+    const response = await api.get('/suggest', { params: { prefix, kind, limit } });
+    return response.data.suggestions;
+  } catch (error) {
+    console.error('❌ Failed to fetch suggestions:', error);
+    throw error;
+  }
+};
+
 export const extractUrlContent = async (request: URLExtractionRequest): Promise<URLExtractionResponse> => {
   try {
     console.log('🔗 Extracting content from URL...', request.url);
@@ -18,17 +18,41 @@ export interface TextAnalysis {
   readability_score?: number;
   word_count?: number;
   sentence_count?: number;
+  // Cosine similarity, only set on related-analyses results
+  similarity?: number;
 }
 
 export interface TextAnalysisRequest {
   text: string;
 }
 
+export interface AnalysisJob {
+  id: string;
+  kind?: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  result?: TextAnalysis | null;
+  error?: string | null;
+  attempts?: number;
+  created_at?: number;
+  updated_at?: number;
+}
+
 export interface SearchParams {
   topic?: string;
   keyword?: string;
   sentiment?: string;
   sortBy?: 'newest' | 'oldest' | 'sentiment';
+  // Only return these fields (id is always included)
+  fields?: (keyof TextAnalysis)[];
+}
+
+export type SuggestionKind = 'topic' | 'keyword' | 'entity';
+
+export interface Suggestion {
+  text: string;
+  // Number of analyses mentioning the term
+  count: number;
+  kinds: SuggestionKind[];
 }
 
 export interface URLExtractionRequest {